@@ -0,0 +1,41 @@
+"""
+Conditional GET helpers
+This module answers If-None-Match with 304 Not Modified and sets ETag headers
+"""
+
+from typing import Dict, Optional
+
+from fastapi import Request, Response, status
+
+
+def etag_matches(if_none_match: Optional[str], etag: str, exists: bool = False) -> bool:
+    """
+    Weak comparison of an If-None-Match header against an ETag. `*` matches
+    any current representation, so it only counts when the caller knows the
+    resource exists.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return exists
+    opaque = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == opaque
+        for candidate in if_none_match.split(",")
+    )
+
+
+def etag_headers(etag: str) -> Dict[str, str]:
+    # no-cache lets clients keep the response but makes them revalidate it
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def not_modified(request: Request, etag: str, exists: bool = False) -> Optional[Response]:
+    """
+    Return a 304 response if the client already has this version, else None.
+    Checked before the resource is looked up, only a matching ETag gives 304;
+    call again with exists=True once it is found to honor If-None-Match: *.
+    """
+    if etag_matches(request.headers.get("if-none-match"), etag, exists):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=etag_headers(etag))
+    return None
@@ -3,7 +3,7 @@ Configuration settings for the FastAPI application
 """
 
 import os
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from pydantic_settings import BaseSettings
 
 
@@ -36,6 +36,65 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
     
+    # Environmental alert settings (defaults match the dashboard thresholds)
+    ALERT_TEMPERATURA_MIN: float = 18.0  # celsius
+    ALERT_TEMPERATURA_MAX: float = 35.0  # celsius
+    ALERT_CO2_MAX: float = 3000.0  # ppm
+    ALERT_AMONIACO_MAX: float = 25.0  # ppm
+    ANOMALY_EWMA_ALPHA: float = 0.1
+    ANOMALY_Z_THRESHOLD: float = 4.0
+    ANOMALY_WARMUP_READINGS: int = 20
+    ALERT_BUFFER_SIZE: int = 10000
+    
+    # Spatial interpolation settings (heatmaps from point sensors)
+    INTERPOLATION_GRID_ROWS: int = 10
+    INTERPOLATION_GRID_COLS: int = 20
+    INTERPOLATION_IDW_POWER: float = 2.0
+    INTERPOLATION_MAX_SENSOR_AGE_SECONDS: int = 900  # behind the newest reading of the nave
+    
+    # Thermal map storage settings (keyframe interval 1 stores every frame in full)
+    THERMAL_KEYFRAME_INTERVAL: int = 60
+    THERMAL_QUANTIZATION: float = 0.1  # celsius
+    THERMAL_COMPRESSION_LEVEL: int = 6
+    
+    # Retention settings: raw rows are kept in monthly partitions and a month is
+    # archived and reduced to its daily aggregates once it is older than this
+    RETENTION_MEDICION_AMBIENTAL_DAYS: int = 90
+    RETENTION_CONSUMO_DAYS: int = 365
+    RETENTION_MAPA_TERMICO_DAYS: int = 30
+    RETENTION_CHECK_INTERVAL_SECONDS: int = 3600
+    ARCHIVE_DIR: str = os.getenv("ARCHIVE_DIR", "archive")
+    
+    # Write path settings
+    REFERENCE_VALIDATION: bool = True  # reject records for lotes known to be non-activo
+    # Also reject parents that are neither cached nor found by DatabaseService.get_*.
+    # Only enable once those lookups query a real database; with the placeholder
+    # lookups every parent not created by this process would be rejected
+    REJECT_UNKNOWN_REFERENCES: bool = os.getenv("REJECT_UNKNOWN_REFERENCES", "false").lower() == "true"
+    MAX_BATCH_SIZE: int = 5000
+    
+    # Compression settings
+    MAX_DECOMPRESSED_BODY_BYTES: int = 64 * 1024 * 1024  # 64 MiB
+    GZIP_MINIMUM_SIZE: int = 1024  # bytes; smaller responses are sent uncompressed
+    
+    # Rate limiting: (requests per second, burst) per device for each ingest router.
+    # Devices are identified by X-Device-Id, then X-API-Key, then client address
+    RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+        "/api/v1/medicion-ambiental": (2.0, 20),
+        "/api/v1/mapa-termico": (1.0, 10),
+        "/api/v1/consumo": (1.0, 20),
+        "/api/v1/alimentacion": (1.0, 20),
+        "/api/v1/mortalidad": (1.0, 20),
+        "/api/v1/crecimiento": (1.0, 20),
+        "/api/v1/pollos": (5.0, 50),
+    }
+    RATE_LIMIT_MAX_CLIENTS: int = 100000
+    # Admission control: writes in flight above which new writes are shed with 429
+    WRITE_HIGH_WATER_MARK: int = 500
+    
+    # Overview settings
+    OVERVIEW_CACHE_TTL_SECONDS: float = 15.0
+    
     # API settings
     API_V1_STR: str = "/api/v1"
     
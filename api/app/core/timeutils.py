@@ -0,0 +1,23 @@
+"""
+Timestamp helpers
+This module normalizes timestamps so naive and timezone-aware values can be compared
+"""
+
+from datetime import datetime, timezone
+from typing import Any
+
+
+def to_utc_naive(value: Any) -> Any:
+    """
+    Convert an aware datetime to naive UTC. Naive datetimes are taken to be
+    UTC already and, like dates and other values, are returned unchanged.
+    """
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+
+def utc_now() -> datetime:
+    """Current time as naive UTC, comparable with normalized timestamps"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
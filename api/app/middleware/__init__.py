@@ -0,0 +1 @@
+# HTTP Middleware Package
\ No newline at end of file
@@ -0,0 +1,167 @@
+"""
+Request body decompression middleware
+Streams gzip/deflate/zstd request bodies to the application with a bounded
+decompressed size, so gateways can upload compressed batches and thermal maps
+"""
+
+import logging
+import zlib
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # zstd bodies are only accepted when zstandard is installed
+    zstandard = None
+
+
+# zstd output cannot be capped per call, so input is fed in small slices to
+# bound how much a single slice of a malicious body can expand before the
+# size check runs
+_ZSTD_SLICE = 256
+
+
+class _ZlibDecoder:
+    """gzip and deflate bodies, decompressed with a per-call output cap"""
+
+    def __init__(self, wbits: int):
+        self._decoder = zlib.decompressobj(wbits)
+
+    def decompress(self, data: bytes, limit: int) -> bytes:
+        # Ask for one byte more than allowed so an oversized body is detected
+        # without ever materializing it
+        return self._decoder.decompress(data, limit + 1)
+
+    def finish(self) -> bytes:
+        if not self._decoder.eof:
+            raise zlib.error("truncated compressed body")
+        return self._decoder.flush()
+
+
+class _ZstdDecoder:
+    """zstd bodies, fed in small slices with the limit checked in between"""
+
+    def __init__(self):
+        self._decoder = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data: bytes, limit: int) -> bytes:
+        out = []
+        size = 0
+        for start in range(0, len(data), _ZSTD_SLICE):
+            chunk = self._decoder.decompress(data[start:start + _ZSTD_SLICE])
+            size += len(chunk)
+            out.append(chunk)
+            if size > limit:
+                break
+        return b"".join(out)
+
+    def finish(self) -> bytes:
+        if not self._decoder.eof:
+            raise zstandard.ZstdError("truncated compressed body")
+        return self._decoder.flush()
+
+
+def _decoder_for(encoding: str):
+    if encoding in ("gzip", "x-gzip"):
+        return _ZlibDecoder(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return _ZlibDecoder(zlib.MAX_WBITS)
+    if encoding == "zstd" and zstandard is not None:
+        return _ZstdDecoder()
+    return None
+
+
+class RequestDecompressionMiddleware:
+    """
+    Decompresses request bodies sent with Content-Encoding as they arrive.
+    Each received chunk is decompressed on its own and handed on, so the
+    compressed body is never buffered; once the decompressed size passes
+    max_size the request fails with 413.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int):
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = Headers(scope=scope).get("content-encoding", "").strip().lower()
+        if encoding in ("", "identity"):
+            await self.app(scope, receive, send)
+            return
+
+        decoder = _decoder_for(encoding)
+        if decoder is None:
+            response = PlainTextResponse(
+                f"Unsupported Content-Encoding: {encoding}", status_code=415
+            )
+            await response(scope, receive, send)
+            return
+
+        # The application sees a plain body of unknown length
+        scope = dict(scope)
+        scope["headers"] = [
+            (name, value) for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ]
+
+        total = 0
+        done = False
+
+        async def receive_decompressed() -> Message:
+            nonlocal total, done
+            if done:
+                return await receive()
+
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+
+            more_body = message.get("more_body", False)
+            try:
+                body = decoder.decompress(message.get("body", b""), self.max_size - total)
+                total += len(body)
+                if total <= self.max_size and not more_body:
+                    tail = decoder.finish()
+                    total += len(tail)
+                    body += tail
+                    done = True
+            except zlib.error as e:
+                raise HTTPException(status_code=400, detail=f"Invalid {encoding} body: {e}")
+            except Exception as e:
+                if zstandard is not None and isinstance(e, zstandard.ZstdError):
+                    raise HTTPException(status_code=400, detail=f"Invalid {encoding} body: {e}")
+                raise
+
+            if total > self.max_size:
+                logger.warning(f"Rejected {encoding} body larger than {self.max_size} bytes")
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Decompressed body exceeds {self.max_size} bytes"
+                )
+            return {"type": "http.request", "body": body, "more_body": more_body}
+
+        response_started = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive_decompressed, send_wrapper)
+        except HTTPException as e:
+            # Raised while reading the body outside of a FastAPI route
+            if response_started:
+                raise
+            response = PlainTextResponse(e.detail, status_code=e.status_code)
+            await response(scope, receive, send)
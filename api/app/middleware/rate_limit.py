@@ -0,0 +1,171 @@
+"""
+Rate limiting and admission control middleware for ingest routes
+Bounds per-device load with token buckets and sheds writes under overload
+"""
+
+import logging
+import math
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Dict, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+_WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+class _TokenBucket:
+    """Tokens refill continuously at `rate` per second up to `burst`"""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst: int, now: float):
+        self.tokens = float(burst)
+        self.updated = now
+
+    def wait(self, rate: float, burst: int, now: float, cost: int = 1) -> float:
+        """Seconds until `cost` tokens can be taken, 0 if they can be now"""
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        # A cost above the burst is admitted from a full bucket and paid off
+        # afterwards, so large batches are slowed down instead of never passing
+        needed = min(cost, burst)
+        return 0.0 if self.tokens >= needed else (needed - self.tokens) / rate
+
+    def take(self, rate: float, burst: int, now: float, cost: int = 1) -> float:
+        """Take `cost` tokens; return 0 on success or the seconds to wait"""
+        wait = self.wait(rate, burst, now, cost)
+        if not wait:
+            self.tokens -= cost
+        return wait
+
+
+def retry_after(seconds: float) -> str:
+    """Retry-After header value for a wait, in whole seconds and at least 1"""
+    return str(max(1, math.ceil(seconds)))
+
+
+def charge_records(request: Request, records: int) -> float:
+    """
+    Charge a batch request one token per record, once its body is parsed.
+    Returns 0, or the seconds to wait when the device is over its limit;
+    routes the middleware does not limit are never charged.
+    """
+    charge = getattr(request.state, "rate_limit_charge", None)
+    return charge(records) if charge is not None else 0.0
+
+
+class RateLimitMiddleware:
+    """
+    Per-device token buckets for the configured route prefixes, plus a global
+    cap on writes in flight. Both checks are O(1) and reject with 429 and a
+    Retry-After header, so a flooding device or an overloaded backend never
+    queues more work behind well-behaved clients.
+    Every request is admitted for one token; batch routes then charge their
+    records with charge_records, from the same bucket as the single-record
+    route, once the body has been validated.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limits: Dict[str, Tuple[float, int]],
+        max_clients: int,
+        write_high_water_mark: int,
+    ):
+        self.app = app
+        # Longest prefix first so nested routes can have their own limits
+        self.limits = sorted(limits.items(), key=lambda item: len(item[0]), reverse=True)
+        self.max_clients = max_clients
+        self.write_high_water_mark = write_high_water_mark
+        self.writes_in_flight = 0
+        self._buckets: "OrderedDict[Tuple[str, str], _TokenBucket]" = OrderedDict()
+
+    def _route(self, path: str) -> Optional[Tuple[str, Tuple[float, int]]]:
+        for prefix, limit in self.limits:
+            if path.startswith(prefix):
+                return prefix, limit
+        return None
+
+    @staticmethod
+    def _client_key(scope: Scope) -> str:
+        headers = Headers(scope=scope)
+        device = headers.get("x-device-id") or headers.get("x-api-key")
+        if device:
+            return device
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def _bucket(self, key: Tuple[str, str], burst: int, now: float) -> _TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _TokenBucket(burst, now)
+            if len(self._buckets) > self.max_clients:
+                # Least recently seen device; a fresh bucket for it is full anyway
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    @staticmethod
+    async def _reject(scope: Scope, receive: Receive, send: Send, detail: str, wait: float) -> None:
+        response = JSONResponse(
+            status_code=429,
+            content={"detail": detail},
+            headers={"Retry-After": retry_after(wait)},
+        )
+        await response(scope, receive, send)
+
+    @staticmethod
+    def _charge(bucket: _TokenBucket, rate: float, burst: int, records: int) -> float:
+        """Take `records` tokens for a request that was admitted for one"""
+        bucket.tokens += 1
+        wait = bucket.take(rate, burst, time.monotonic(), records)
+        if wait:
+            # A rejected batch still pays its admission, and the wait covers it
+            bucket.tokens -= 1
+            wait += 1 / rate
+        return wait
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in _WRITE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route(scope["path"])
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+
+        if self.writes_in_flight >= self.write_high_water_mark:
+            logger.warning(f"Shedding write to {scope['path']}: {self.writes_in_flight} writes in flight")
+            await self._reject(scope, receive, send, "Server is overloaded, retry later", 1)
+            return
+
+        prefix, (rate, burst) = route
+        client = self._client_key(scope)
+        now = time.monotonic()
+        bucket = self._bucket((prefix, client), burst, now)
+
+        wait = bucket.take(rate, burst, now)
+        if wait:
+            await self._reject(
+                scope, receive, send,
+                f"Rate limit of {rate:g} records/s exceeded for {prefix}", wait
+            )
+            return
+
+        # The body is only parsed by the route, which charges the rest of a batch
+        scope.setdefault("state", {})["rate_limit_charge"] = partial(self._charge, bucket, rate, burst)
+
+        self.writes_in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.writes_in_flight -= 1
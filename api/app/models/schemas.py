@@ -28,6 +28,16 @@ class TipoAlimento(str, Enum):
     FINALIZADOR = "Finalizador"
 
 
+class TipoAlerta(str, Enum):
+    UMBRAL = "umbral"
+    DESVIACION = "desviacion"
+
+
+class SeveridadAlerta(str, Enum):
+    ADVERTENCIA = "advertencia"
+    CRITICA = "critica"
+
+
 # Base models for creation (without IDs)
 class UsuarioCreate(BaseModel):
     nombre: str = Field(..., min_length=1, max_length=100)
@@ -45,15 +55,28 @@ class GranjaCreate(BaseModel):
     usuario_id: int = Field(..., gt=0)
 
 
+class NaveCreate(BaseModel):
+    nombre: str = Field(..., min_length=1, max_length=100)
+    capacidad: int = Field(..., gt=0)
+    ubicacion: Optional[str] = Field(None, max_length=200)
+    estado: str = Field("activa", max_length=50)
+    area: float = Field(..., gt=0)  # in square meters
+
+
 class LoteCreate(BaseModel):
     codigo: str = Field(..., min_length=1, max_length=50)
     fecha_ingreso: date
     cantidad_inicial: int = Field(..., gt=0)
     raza: str = Field(..., min_length=1, max_length=100)
     granja_id: int = Field(..., gt=0)
+    nave_id: Optional[int] = Field(None, gt=0)
     estado: EstadoLote = EstadoLote.ACTIVO
 
 
+class LoteEstadoUpdate(BaseModel):
+    estado: EstadoLote
+
+
 class PolloCreate(BaseModel):
     lote_id: int = Field(..., gt=0)
     identificador: str = Field(..., min_length=1, max_length=50)
@@ -119,6 +142,8 @@ class MapaTermicoCreate(BaseModel):
             raise ValueError('temperaturas must be a 2D list')
         if not all(all(isinstance(temp, (int, float)) for temp in row) for row in v):
             raise ValueError('All temperature values must be numbers')
+        if not v[0] or any(len(row) != len(v[0]) for row in v):
+            raise ValueError('temperaturas rows must be non-empty and of equal length')
         return v
 
 
@@ -137,6 +162,13 @@ class Granja(GranjaCreate):
         from_attributes = True
 
 
+class Nave(NaveCreate):
+    nave_id: int
+    
+    class Config:
+        from_attributes = True
+
+
 class Lote(LoteCreate):
     lote_id: int
     
@@ -0,0 +1,47 @@
+"""
+API router for alertas (environmental alerts) endpoints
+"""
+
+from typing import Optional
+
+from fastapi import APIRouter, Query, Request, Response
+
+from app.core.conditional import not_modified, etag_headers
+from app.models.schemas import APIResponse
+from app.services.anomalies import get_alerts
+from app.services.versions import get_lote_etag, get_table_etag
+
+router = APIRouter(
+    prefix="/alertas",
+    tags=["alertas"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.get("/", response_model=APIResponse)
+async def get_alertas_endpoint(
+    request: Request,
+    response: Response,
+    lote_id: Optional[int] = Query(None, gt=0),
+    limit: int = Query(100, gt=0, le=1000),
+):
+    """
+    Get the most recent environmental alerts
+    
+    Alerts are raised while ingesting environmental measurements, for threshold
+    breaches and sudden deviations in temperatura, co2 and amoniaco.
+    Send the returned ETag as If-None-Match to get 304 Not Modified while no alert was raised.
+    """
+    etag = get_lote_etag(lote_id, ("alerta",)) if lote_id else get_table_etag("alerta")
+    unchanged = not_modified(request, etag, exists=True)
+    if unchanged is not None:
+        return unchanged
+    
+    alertas = get_alerts(lote_id, limit)
+    
+    response.headers.update(etag_headers(etag))
+    return APIResponse(
+        success=True,
+        message="Alertas retrieved successfully",
+        data={"alertas": alertas, "total": len(alertas)}
+    )
@@ -6,6 +6,7 @@ from fastapi import APIRouter, HTTPException, status
 
 from app.models.schemas import CrecimientoCreate, APIResponse
 from app.services.database import create_crecimiento
+from app.services.references import UnknownReferenceError, InactiveReferenceError
 
 router = APIRouter(
     prefix="/crecimiento",
@@ -30,6 +31,16 @@ async def create_crecimiento_endpoint(crecimiento_data: CrecimientoCreate):
             data=result
         )
         
+    except UnknownReferenceError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except InactiveReferenceError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
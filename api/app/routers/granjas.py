@@ -6,6 +6,7 @@ from fastapi import APIRouter, HTTPException, status
 
 from app.models.schemas import GranjaCreate, APIResponse
 from app.services.database import create_granja
+from app.services.references import UnknownReferenceError
 
 router = APIRouter(
     prefix="/granjas",
@@ -30,6 +31,11 @@ async def create_granja_endpoint(granja_data: GranjaCreate):
             data=result
         )
         
+    except UnknownReferenceError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -2,10 +2,15 @@
 API router for lote (batches/lots) endpoints
 """
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, Response, status
 
-from app.models.schemas import LoteCreate, APIResponse
-from app.services.database import create_lote
+from app.core.conditional import not_modified, etag_headers
+from app.models.schemas import LoteCreate, LoteEstadoUpdate, APIResponse
+from app.services.database import create_lote, update_lote_estado
+from app.services.references import UnknownReferenceError
+from app.services.kpis import get_lote_kpis
+from app.services.storage import get_daily_rollups, PARTITIONED_TABLES
+from app.services.versions import get_lote_etag, KPI_TABLES, KPI_TABLE_SCOPES
 
 router = APIRouter(
     prefix="/lotes",
@@ -30,8 +35,98 @@ async def create_lote_endpoint(lote_data: LoteCreate):
             data=result
         )
         
+    except UnknownReferenceError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating lote: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.patch("/{lote_id}/estado", response_model=APIResponse)
+async def update_lote_estado_endpoint(lote_id: int, estado_data: LoteEstadoUpdate):
+    """
+    Change the estado of a batch/lot
+    
+    Records can only be added to activo lotes; once a lote is inactivo or vendido,
+    new readings for it are rejected.
+    """
+    try:
+        result = await update_lote_estado(lote_id, estado_data.estado)
+        
+        return APIResponse(
+            success=True,
+            message="Lote estado updated successfully",
+            data=result
+        )
+        
+    except UnknownReferenceError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error updating lote estado: {str(e)}"
+        )
+
+
+@router.get("/{lote_id}/kpis", response_model=APIResponse)
+async def get_lote_kpis_endpoint(lote_id: int, request: Request, response: Response):
+    """
+    Get the daily KPIs of a batch/lot
+    
+    Returns feed conversion, cumulative mortality, density and water:feed ratio,
+    both current and as a daily series, from the incrementally maintained totals.
+    Send the returned ETag as If-None-Match to get 304 Not Modified while nothing changed.
+    """
+    etag = get_lote_etag(lote_id, KPI_TABLES, KPI_TABLE_SCOPES)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    
+    result = get_lote_kpis(lote_id)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Lote {lote_id} not found"
+        )
+
+    unchanged = not_modified(request, etag, exists=True)
+    if unchanged is not None:
+        return unchanged
+    
+    response.headers.update(etag_headers(etag))
+    return APIResponse(
+        success=True,
+        message="Lote KPIs retrieved successfully",
+        data=result
+    )
+
+
+@router.get("/{lote_id}/agregados/{tabla}", response_model=APIResponse)
+async def get_lote_agregados_endpoint(lote_id: int, tabla: str):
+    """
+    Get the daily aggregates of a batch/lot's expired readings
+    
+    `tabla` is medicion_ambiental, consumo or mapa_termico. Once a month passes
+    retention its raw rows are archived and only these per-day count/mean/min/max/sum
+    aggregates stay queryable.
+    """
+    if tabla not in PARTITIONED_TABLES:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No daily aggregates for {tabla}; use one of {', '.join(PARTITIONED_TABLES)}"
+        )
+    
+    agregados = get_daily_rollups(tabla, lote_id)
+    return APIResponse(
+        success=True,
+        message="Daily aggregates retrieved successfully",
+        data={"lote_id": lote_id, "tabla": tabla, "agregados": agregados, "total": len(agregados)}
+    )
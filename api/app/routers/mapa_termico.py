@@ -2,10 +2,19 @@
 API router for mapa_termico (thermal maps) endpoints
 """
 
-from fastapi import APIRouter, HTTPException, status
+import json
+from datetime import datetime
+from typing import Optional
 
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from app.core.conditional import not_modified, etag_headers
 from app.models.schemas import MapaTermicoCreate, APIResponse
 from app.services.database import create_mapa_termico
+from app.services.references import UnknownReferenceError, InactiveReferenceError
+from app.services.thermal_storage import get_mapa_termico, iter_mapas_termicos
+from app.services.versions import get_lote_etag
 
 router = APIRouter(
     prefix="/mapa-termico",
@@ -30,8 +39,82 @@ async def create_mapa_termico_endpoint(mapa_data: MapaTermicoCreate):
             data=result
         )
         
+    except UnknownReferenceError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except InactiveReferenceError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating mapa termico: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/{lote_id}", response_model=APIResponse)
+async def get_mapa_termico_endpoint(
+    lote_id: int,
+    request: Request,
+    response: Response,
+    fecha: Optional[datetime] = Query(None),
+):
+    """
+    Get a thermal map by timestamp
+    
+    Returns the frame in effect at `fecha` (the latest one at or before it),
+    reconstructed from its keyframe and deltas. Without `fecha` the latest frame is returned.
+    Send the returned ETag as If-None-Match to get 304 Not Modified while no frame was added.
+    """
+    etag = get_lote_etag(lote_id, ("mapa_termico",))
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    
+    result = get_mapa_termico(lote_id, fecha)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No mapa termico for lote {lote_id} at that time"
+        )
+
+    unchanged = not_modified(request, etag, exists=True)
+    if unchanged is not None:
+        return unchanged
+    
+    response.headers.update(etag_headers(etag))
+    return APIResponse(
+        success=True,
+        message="Mapa termico retrieved successfully",
+        data=result
+    )
+
+
+@router.get("/{lote_id}/rango")
+async def get_mapa_termico_rango_endpoint(
+    lote_id: int,
+    request: Request,
+    desde: Optional[datetime] = Query(None),
+    hasta: Optional[datetime] = Query(None),
+):
+    """
+    Stream thermal maps in a time range for playback
+    
+    Frames are reconstructed one at a time and streamed as NDJSON, one map per line.
+    """
+    etag = get_lote_etag(lote_id, ("mapa_termico",))
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    
+    def generate():
+        for frame in iter_mapas_termicos(lote_id, desde, hasta):
+            yield json.dumps(frame, default=str) + "\n"
+    
+    return StreamingResponse(
+        generate(), media_type="application/x-ndjson", headers=etag_headers(etag)
+    )
@@ -2,10 +2,15 @@
 API router for medicion_ambiental (environmental measurements) endpoints
 """
 
-from fastapi import APIRouter, HTTPException, status
+from typing import List
 
+from fastapi import APIRouter, HTTPException, Request, status
+
+from app.core.config import settings
+from app.middleware.rate_limit import charge_records, retry_after
 from app.models.schemas import MedicionAmbientalCreate, APIResponse
-from app.services.database import create_medicion_ambiental
+from app.services.database import create_medicion_ambiental, create_mediciones_ambientales
+from app.services.references import UnknownReferenceError, InactiveReferenceError
 
 router = APIRouter(
     prefix="/medicion-ambiental",
@@ -30,8 +35,57 @@ async def create_medicion_ambiental_endpoint(medicion_data: MedicionAmbientalCre
             data=result
         )
         
+    except UnknownReferenceError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except InactiveReferenceError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating medicion ambiental: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.post("/batch", response_model=APIResponse, status_code=status.HTTP_201_CREATED)
+async def create_mediciones_ambientales_endpoint(mediciones: List[MedicionAmbientalCreate], request: Request):
+    """
+    Create a batch of environmental measurement records
+    
+    Readings whose lote is unknown or not activo are rejected individually and
+    listed in the response; the rest of the batch is created.
+    The batch counts one record per reading against the device's rate limit.
+    """
+    if len(mediciones) > settings.MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.MAX_BATCH_SIZE} records"
+        )
+    
+    wait = charge_records(request, len(mediciones))
+    if wait:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Rate limit exceeded for a batch of {len(mediciones)} records",
+            headers={"Retry-After": retry_after(wait)}
+        )
+    
+    try:
+        result = await create_mediciones_ambientales(mediciones)
+        
+        return APIResponse(
+            success=True,
+            message=f"{result['creados']} medicion ambiental records created successfully",
+            data=result
+        )
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating medicion ambiental batch: {str(e)}"
+        )
@@ -0,0 +1,73 @@
+"""
+API router for nave (barns) endpoints
+"""
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
+
+from app.core.conditional import not_modified, etag_headers
+from app.models.schemas import NaveCreate, APIResponse
+from app.services.database import create_nave
+from app.services.interpolation import get_interpolated_map, get_interpolated_map_etag
+
+router = APIRouter(
+    prefix="/naves",
+    tags=["naves"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.post("/", response_model=APIResponse, status_code=status.HTTP_201_CREATED)
+async def create_nave_endpoint(nave_data: NaveCreate):
+    """
+    Create a new barn
+    
+    This endpoint allows AWS IoT Core or other systems to create new barns in the system.
+    """
+    try:
+        result = await create_nave(nave_data)
+        
+        return APIResponse(
+            success=True,
+            message="Nave created successfully",
+            data=result
+        )
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error creating nave: {str(e)}"
+        )
+
+
+
+@router.get("/{nave_id}/mapa-termico", response_model=APIResponse)
+async def get_nave_mapa_termico_endpoint(nave_id: int, request: Request, response: Response):
+    """
+    Get an interpolated thermal map of a barn
+    
+    Builds a mapa_termico-shaped temperature grid from the latest point sensor
+    readings, whose ubicacion must be given as "x,y" in meters.
+    Send the returned ETag as If-None-Match to get 304 Not Modified while no reading arrived.
+    """
+    etag = get_interpolated_map_etag(nave_id)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    
+    result = get_interpolated_map(nave_id)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No positioned sensor readings for nave {nave_id}"
+        )
+
+    unchanged = not_modified(request, etag, exists=True)
+    if unchanged is not None:
+        return unchanged
+    
+    response.headers.update(etag_headers(etag))
+    return APIResponse(
+        success=True,
+        message="Interpolated mapa termico retrieved successfully",
+        data=result
+    )
@@ -2,11 +2,13 @@
 API router for usuario (users) endpoints
 """
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, Response, status
 from fastapi.responses import JSONResponse
 
+from app.core.conditional import not_modified, etag_headers
 from app.models.schemas import UsuarioCreate, APIResponse, ErrorResponse
 from app.services.database import create_usuario
+from app.services.overview import get_usuario_overview, get_usuario_overview_etag
 
 router = APIRouter(
     prefix="/usuarios",
@@ -35,4 +37,37 @@ async def create_usuario_endpoint(usuario_data: UsuarioCreate):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error creating usuario: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@router.get("/{usuario_id}/overview", response_model=APIResponse)
+async def get_usuario_overview_endpoint(usuario_id: int, request: Request, response: Response):
+    """
+    Get an overview of all farms of a user
+    
+    Returns current KPIs, latest environment and alert counts for every granja,
+    nave and lote of the user in a single response.
+    Send the returned ETag as If-None-Match to get 304 Not Modified while nothing changed.
+    """
+    etag = get_usuario_overview_etag(usuario_id)
+    unchanged = not_modified(request, etag)
+    if unchanged is not None:
+        return unchanged
+    
+    result = await get_usuario_overview(usuario_id, etag)
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Usuario {usuario_id} not found"
+        )
+
+    unchanged = not_modified(request, etag, exists=True)
+    if unchanged is not None:
+        return unchanged
+    
+    response.headers.update(etag_headers(etag))
+    return APIResponse(
+        success=True,
+        message="Usuario overview retrieved successfully",
+        data=result
+    )
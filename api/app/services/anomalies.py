@@ -0,0 +1,185 @@
+"""
+Streaming anomaly detection for environmental measurements
+This module flags threshold breaches and sudden deviations as readings are ingested
+"""
+
+import logging
+import math
+from collections import deque
+from typing import Optional, Dict, Any, Iterable, List, Tuple
+from datetime import datetime
+
+from app.core.config import settings
+from app.models.schemas import TipoAlerta, SeveridadAlerta
+
+logger = logging.getLogger(__name__)
+
+
+# Minimum standard deviation per metric, so a very stable sensor does not
+# turn sensor noise into deviation alerts
+_MIN_STD = {
+    "temperatura": 0.5,  # celsius
+    "co2": 50.0,  # ppm
+    "amoniaco": 1.0,  # ppm
+}
+
+# How far back inside its limit a metric must return before another threshold
+# alert can be raised for the same sensor, so a value hovering at the limit
+# does not alert on every reading
+_HYSTERESIS = {
+    "temperatura": 1.0,  # celsius
+    "co2": 200.0,  # ppm
+    "amoniaco": 2.0,  # ppm
+}
+
+
+class _EWMAStats:
+    """Exponentially weighted mean and variance of one sensor stream"""
+
+    __slots__ = ("mean", "var", "count")
+
+    def __init__(self):
+        self.mean = 0.0
+        self.var = 0.0
+        self.count = 0
+
+    def update(self, value: float, alpha: float) -> None:
+        if self.count == 0:
+            self.mean = value
+        else:
+            diff = value - self.mean
+            incr = alpha * diff
+            self.mean += incr
+            self.var = (1 - alpha) * (self.var + diff * incr)
+        self.count += 1
+
+
+class AnomalyDetector:
+    """
+    Online detector for temperatura, co2 and amoniaco readings.
+    Keeps one EWMA state per (lote, ubicacion, metric), so each reading is
+    checked in constant time and memory does not grow with history.
+    Threshold alerts are raised when a sensor enters the breached state, not
+    on every reading while it stays there.
+    """
+
+    def __init__(self):
+        self._stats: Dict[Tuple[int, Optional[str], str], _EWMAStats] = {}
+        self._breaches: Dict[Tuple[int, Optional[str], str], str] = {}  # "alta" or "baja"
+        self._alerts: deque = deque(maxlen=settings.ALERT_BUFFER_SIZE)
+        self._counts: Dict[int, Dict[str, int]] = {}
+        self._next_id = 1
+
+    def _limits(self, metrica: str) -> Tuple[Optional[float], Optional[float]]:
+        if metrica == "temperatura":
+            return settings.ALERT_TEMPERATURA_MIN, settings.ALERT_TEMPERATURA_MAX
+        if metrica == "co2":
+            return None, settings.ALERT_CO2_MAX
+        return None, settings.ALERT_AMONIACO_MAX
+
+    def _publish(
+        self,
+        medicion: Dict[str, Any],
+        metrica: str,
+        tipo: TipoAlerta,
+        severidad: SeveridadAlerta,
+        valor: float,
+        referencia: float,
+        mensaje: str,
+    ) -> Dict[str, Any]:
+        alert = {
+            "alerta_id": self._next_id,
+            "lote_id": medicion["lote_id"],
+            "ubicacion": medicion.get("ubicacion"),
+            "metrica": metrica,
+            "tipo": tipo,
+            "severidad": severidad,
+            "valor": valor,
+            "referencia": round(referencia, 3),
+            "fecha_hora": medicion["fecha_hora"],
+            "mensaje": mensaje,
+            "created_at": datetime.now(),
+        }
+        self._next_id += 1
+        self._alerts.append(alert)
+        counts = self._counts.setdefault(medicion["lote_id"], {s.value: 0 for s in SeveridadAlerta})
+        counts[severidad.value] += 1
+        logger.warning(f"Alert for lote {medicion['lote_id']}: {mensaje}")
+        return alert
+
+    def check_medicion(self, medicion: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Update the running statistics with a reading and return any new alerts"""
+        alerts = []
+        alpha = settings.ANOMALY_EWMA_ALPHA
+
+        for metrica in _MIN_STD:
+            valor = medicion.get(metrica)
+            if valor is None:
+                continue
+
+            key = (medicion["lote_id"], medicion.get("ubicacion"), metrica)
+            minimo, maximo = self._limits(metrica)
+            breach = self._breaches.get(key)
+            if maximo is not None and valor > maximo:
+                if breach != "alta":
+                    self._breaches[key] = "alta"
+                    alerts.append(self._publish(
+                        medicion, metrica, TipoAlerta.UMBRAL, SeveridadAlerta.CRITICA,
+                        valor, maximo, f"{metrica} alta: {valor} (límite: {maximo})"
+                    ))
+            elif minimo is not None and valor < minimo:
+                if breach != "baja":
+                    self._breaches[key] = "baja"
+                    alerts.append(self._publish(
+                        medicion, metrica, TipoAlerta.UMBRAL, SeveridadAlerta.CRITICA,
+                        valor, minimo, f"{metrica} baja: {valor} (límite: {minimo})"
+                    ))
+            elif breach == "alta" and valor <= maximo - _HYSTERESIS[metrica]:
+                del self._breaches[key]
+            elif breach == "baja" and valor >= minimo + _HYSTERESIS[metrica]:
+                del self._breaches[key]
+
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = _EWMAStats()
+
+            # Score against the statistics before this reading is folded in
+            if stats.count >= settings.ANOMALY_WARMUP_READINGS:
+                std = max(math.sqrt(stats.var), _MIN_STD[metrica])
+                z = (valor - stats.mean) / std
+                if abs(z) >= settings.ANOMALY_Z_THRESHOLD:
+                    alerts.append(self._publish(
+                        medicion, metrica, TipoAlerta.DESVIACION,
+                        SeveridadAlerta.ADVERTENCIA, valor, stats.mean,
+                        f"{metrica} con cambio brusco: {valor} "
+                        f"(esperado: {stats.mean:.1f}, z={z:.1f})"
+                    ))
+
+            stats.update(valor, alpha)
+
+        return alerts
+
+    def count_alerts(self, lote_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+        """Alerts raised per lote and severity since startup"""
+        empty = {s.value: 0 for s in SeveridadAlerta}
+        return {lote_id: dict(self._counts.get(lote_id, empty)) for lote_id in lote_ids}
+
+    def get_alerts(self, lote_id: Optional[int] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Return the most recent alerts first, optionally for a single lote"""
+        result = []
+        for alert in reversed(self._alerts):
+            if lote_id is not None and alert["lote_id"] != lote_id:
+                continue
+            result.append(alert)
+            if len(result) >= limit:
+                break
+        return result
+
+
+# Create a singleton instance
+anomaly_detector = AnomalyDetector()
+
+
+# Convenience functions for easy imports
+def get_alerts(lote_id: Optional[int] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    return anomaly_detector.get_alerts(lote_id, limit)
@@ -5,14 +5,25 @@ This module handles all database operations
 
 import json
 import logging
-from typing import Optional, Dict, Any
+from dataclasses import asdict
+from typing import Optional, Dict, Any, Iterable, List
 from datetime import datetime, date
 
+from app.core.config import settings
 from app.models.schemas import (
-    UsuarioCreate, GranjaCreate, LoteCreate, PolloCreate,
+    EstadoLote, UsuarioCreate, GranjaCreate, NaveCreate, LoteCreate, PolloCreate,
     CrecimientoCreate, ConsumoCreate, AlimentacionCreate,
     MedicionAmbientalCreate, MortalidadCreate, MapaTermicoCreate
 )
+from app.services.kpis import kpi_engine
+from app.services.anomalies import anomaly_detector
+from app.services.interpolation import spatial_interpolator
+from app.services.thermal_storage import thermal_store
+from app.services.storage import partitioned_storage
+from app.services.versions import version_tracker
+from app.services.references import (
+    reference_cache, UnknownReferenceError, InvalidReferenceError
+)
 
 logger = logging.getLogger(__name__)
 
@@ -28,8 +39,101 @@ class DatabaseService:
         """Initialize database connection"""
         # TODO: Initialize actual database connection here
         # Example: self.db = create_connection(DATABASE_URL)
+        # medicion_ambiental, consumo and mapa_termico go through
+        # partitioned_storage, which maps to monthly declarative partitions
+        # (PARTITION BY RANGE on the time column) on PostgreSQL
         logger.info("Database service initialized")
     
+    async def get_usuario(self, usuario_id: int) -> Optional[Dict[str, Any]]:
+        """Fetch a user by id"""
+        # TODO: Replace with actual database query
+        # Example SQL: SELECT usuario_id FROM usuario WHERE usuario_id = %s
+        return None
+    
+    async def get_granja(self, granja_id: int) -> Optional[Dict[str, Any]]:
+        """Fetch a farm by id"""
+        # TODO: Replace with actual database query
+        # Example SQL: SELECT granja_id, usuario_id, capacidad FROM granja WHERE granja_id = %s
+        return None
+    
+    async def get_lote(self, lote_id: int) -> Optional[Dict[str, Any]]:
+        """Fetch a batch/lot by id"""
+        # TODO: Replace with actual database query
+        # Example SQL: SELECT lote_id, granja_id, nave_id, estado, cantidad_inicial, fecha_ingreso
+        #              FROM lote WHERE lote_id = %s
+        return None
+    
+    async def load_reference_cache(self) -> None:
+        """
+        Load the usuarios, granjas and lotes the write path validates against,
+        and start KPI tracking for the existing naves and lotes
+        """
+        # TODO: Replace with actual database queries
+        # Example SQL: SELECT usuario_id FROM usuario;
+        #              SELECT granja_id, usuario_id, capacidad FROM granja;
+        #              SELECT nave_id, area FROM nave;
+        #              SELECT lote_id, granja_id, nave_id, estado, cantidad_inicial, fecha_ingreso FROM lote
+        naves = []
+        lotes = []
+        reference_cache.load(usuarios=[], granjas=[], lotes=lotes)
+        for nave in naves:
+            kpi_engine.register_nave(nave)
+        for lote in lotes:
+            self._track_lote(lote)
+    
+    def _track_lote(self, lote: Dict[str, Any]) -> None:
+        """Start KPI and sensor tracking for a lote, however it became known"""
+        kpi_engine.register_lote(lote)
+        spatial_interpolator.register_lote(lote)
+    
+    async def _check_usuario(self, usuario_id: int) -> None:
+        if not settings.REFERENCE_VALIDATION or reference_cache.has_usuario(usuario_id):
+            return
+        usuario = await self.get_usuario(usuario_id)
+        if usuario is None:
+            if settings.REJECT_UNKNOWN_REFERENCES:
+                raise UnknownReferenceError(f"Usuario {usuario_id} not found")
+            return
+        reference_cache.put_usuario(usuario)
+    
+    async def _check_granja(self, granja_id: int) -> None:
+        if not settings.REFERENCE_VALIDATION or reference_cache.get_granja(granja_id):
+            return
+        granja = await self.get_granja(granja_id)
+        if granja is None:
+            if settings.REJECT_UNKNOWN_REFERENCES:
+                raise UnknownReferenceError(f"Granja {granja_id} not found")
+            return
+        reference_cache.put_granja(granja)
+    
+    async def _lote_errors(self, lote_ids: List[int]) -> Dict[int, InvalidReferenceError]:
+        """
+        Check lotes against the cache, going to the database only on a miss.
+        A lote found nowhere is only an error with REJECT_UNKNOWN_REFERENCES.
+        """
+        if not settings.REFERENCE_VALIDATION:
+            return {}
+        errors = reference_cache.check_lotes(lote_ids)
+        for lote_id, error in list(errors.items()):
+            if isinstance(error, UnknownReferenceError):
+                lote = await self.get_lote(lote_id)
+                if lote is None:
+                    if not settings.REJECT_UNKNOWN_REFERENCES:
+                        errors.pop(lote_id)
+                else:
+                    reference_cache.put_lote(lote)
+                    self._track_lote(lote)
+                    errors.pop(lote_id)
+                    error = reference_cache.lote_error(lote_id)
+                    if error is not None:
+                        errors[lote_id] = error
+        return errors
+    
+    async def _check_lote(self, lote_id: int) -> None:
+        errors = await self._lote_errors([lote_id])
+        if errors:
+            raise errors[lote_id]
+    
     async def create_usuario(self, usuario_data: UsuarioCreate) -> Dict[str, Any]:
         """Create a new user"""
         try:
@@ -44,6 +148,8 @@ class DatabaseService:
                 **usuario_data.dict(),
                 "created_at": datetime.now()
             }
+            reference_cache.put_usuario(result)
+            version_tracker.bump_table("usuario")
             logger.info(f"Created usuario with data: {usuario_data.dict()}")
             return result
             
@@ -53,6 +159,7 @@ class DatabaseService:
     
     async def create_granja(self, granja_data: GranjaCreate) -> Dict[str, Any]:
         """Create a new farm"""
+        await self._check_usuario(granja_data.usuario_id)
         try:
             # TODO: Replace with actual database insertion
             mock_id = 1
@@ -61,6 +168,8 @@ class DatabaseService:
                 **granja_data.dict(),
                 "created_at": datetime.now()
             }
+            reference_cache.put_granja(result)
+            version_tracker.bump_table("granja")
             logger.info(f"Created granja with data: {granja_data.dict()}")
             return result
             
@@ -68,8 +177,28 @@ class DatabaseService:
             logger.error(f"Error creating granja: {str(e)}")
             raise
     
+    async def create_nave(self, nave_data: NaveCreate) -> Dict[str, Any]:
+        """Create a new barn"""
+        try:
+            # TODO: Replace with actual database insertion
+            mock_id = 1
+            result = {
+                "nave_id": mock_id,
+                **nave_data.dict(),
+                "created_at": datetime.now()
+            }
+            kpi_engine.register_nave(result)
+            version_tracker.bump_table("nave")
+            logger.info(f"Created nave with data: {nave_data.dict()}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error creating nave: {str(e)}")
+            raise
+    
     async def create_lote(self, lote_data: LoteCreate) -> Dict[str, Any]:
         """Create a new batch/lot"""
+        await self._check_granja(lote_data.granja_id)
         try:
             # TODO: Replace with actual database insertion
             mock_id = 1
@@ -78,6 +207,9 @@ class DatabaseService:
                 **lote_data.dict(),
                 "created_at": datetime.now()
             }
+            reference_cache.put_lote(result)
+            self._track_lote(result)
+            version_tracker.bump(result["lote_id"], "lote")
             logger.info(f"Created lote with data: {lote_data.dict()}")
             return result
             
@@ -85,8 +217,35 @@ class DatabaseService:
             logger.error(f"Error creating lote: {str(e)}")
             raise
     
+    async def update_lote_estado(self, lote_id: int, estado: EstadoLote) -> Dict[str, Any]:
+        """Change the estado of a batch/lot"""
+        if settings.REFERENCE_VALIDATION and reference_cache.get_lote(lote_id) is None:
+            lote = await self.get_lote(lote_id)
+            if lote is not None:
+                reference_cache.put_lote(lote)
+                self._track_lote(lote)
+            elif settings.REJECT_UNKNOWN_REFERENCES:
+                raise UnknownReferenceError(f"Lote {lote_id} not found")
+        try:
+            # TODO: Replace with actual database update
+            # Example SQL: UPDATE lote SET estado = %s, updated_at = now() WHERE lote_id = %s
+            result = {
+                "lote_id": lote_id,
+                "estado": estado,
+                "updated_at": datetime.now()
+            }
+            reference_cache.set_lote_estado(lote_id, estado)
+            version_tracker.bump(lote_id, "lote")
+            logger.info(f"Updated lote {lote_id} estado to {estado.value}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error updating lote estado: {str(e)}")
+            raise
+    
     async def create_pollo(self, pollo_data: PolloCreate) -> Dict[str, Any]:
         """Create a new individual chicken record"""
+        await self._check_lote(pollo_data.lote_id)
         try:
             # TODO: Replace with actual database insertion
             mock_id = 1
@@ -95,6 +254,7 @@ class DatabaseService:
                 **pollo_data.dict(),
                 "created_at": datetime.now()
             }
+            version_tracker.bump(result["lote_id"], "pollo")
             logger.info(f"Created pollo with data: {pollo_data.dict()}")
             return result
             
@@ -104,6 +264,7 @@ class DatabaseService:
     
     async def create_crecimiento(self, crecimiento_data: CrecimientoCreate) -> Dict[str, Any]:
         """Create a new growth record"""
+        await self._check_lote(crecimiento_data.lote_id)
         try:
             # TODO: Replace with actual database insertion
             mock_id = 1
@@ -112,6 +273,8 @@ class DatabaseService:
                 **crecimiento_data.dict(),
                 "created_at": datetime.now()
             }
+            kpi_engine.record_crecimiento(result)
+            version_tracker.bump(result["lote_id"], "crecimiento")
             logger.info(f"Created crecimiento with data: {crecimiento_data.dict()}")
             return result
             
@@ -121,6 +284,7 @@ class DatabaseService:
     
     async def create_consumo(self, consumo_data: ConsumoCreate) -> Dict[str, Any]:
         """Create a new consumption record"""
+        await self._check_lote(consumo_data.lote_id)
         try:
             # TODO: Replace with actual database insertion
             mock_id = 1
@@ -129,6 +293,9 @@ class DatabaseService:
                 **consumo_data.dict(),
                 "created_at": datetime.now()
             }
+            partitioned_storage.insert("consumo", result)
+            kpi_engine.record_consumo(result)
+            version_tracker.bump(result["lote_id"], "consumo")
             logger.info(f"Created consumo with data: {consumo_data.dict()}")
             return result
             
@@ -138,6 +305,7 @@ class DatabaseService:
     
     async def create_alimentacion(self, alimentacion_data: AlimentacionCreate) -> Dict[str, Any]:
         """Create a new feeding record"""
+        await self._check_lote(alimentacion_data.lote_id)
         try:
             # TODO: Replace with actual database insertion
             mock_id = 1
@@ -146,6 +314,8 @@ class DatabaseService:
                 **alimentacion_data.dict(),
                 "created_at": datetime.now()
             }
+            kpi_engine.record_alimentacion(result)
+            version_tracker.bump(result["lote_id"], "alimentacion")
             logger.info(f"Created alimentacion with data: {alimentacion_data.dict()}")
             return result
             
@@ -155,6 +325,36 @@ class DatabaseService:
     
     async def create_medicion_ambiental(self, medicion_data: MedicionAmbientalCreate) -> Dict[str, Any]:
         """Create a new environmental measurement record"""
+        await self._check_lote(medicion_data.lote_id)
+        return await self._insert_medicion_ambiental(medicion_data)
+    
+    async def create_mediciones_ambientales(self, mediciones: List[MedicionAmbientalCreate]) -> Dict[str, Any]:
+        """
+        Create a batch of environmental measurement records.
+        All lotes of the batch are validated in one pass; readings for
+        invalid lotes are rejected and the rest are created.
+        """
+        errors = await self._lote_errors([m.lote_id for m in mediciones])
+        creados = 0
+        rechazados = []
+        alertas = []
+        for indice, medicion_data in enumerate(mediciones):
+            error = errors.get(medicion_data.lote_id)
+            if error is not None:
+                rechazados.append({
+                    "indice": indice,
+                    "lote_id": medicion_data.lote_id,
+                    "error": str(error)
+                })
+                continue
+            result = await self._insert_medicion_ambiental(medicion_data)
+            alertas.extend(result["alertas"])
+            creados += 1
+        
+        return {"creados": creados, "rechazados": rechazados, "alertas": alertas}
+    
+    async def _insert_medicion_ambiental(self, medicion_data: MedicionAmbientalCreate) -> Dict[str, Any]:
+        """Insert an environmental measurement whose lote is already validated"""
         try:
             # TODO: Replace with actual database insertion
             mock_id = 1
@@ -163,6 +363,12 @@ class DatabaseService:
                 **medicion_data.dict(),
                 "created_at": datetime.now()
             }
+            partitioned_storage.insert("medicion_ambiental", dict(result))
+            spatial_interpolator.record_medicion(result)
+            result["alertas"] = anomaly_detector.check_medicion(result)
+            version_tracker.bump(result["lote_id"], "medicion_ambiental")
+            if result["alertas"]:
+                version_tracker.bump(result["lote_id"], "alerta")
             logger.info(f"Created medicion_ambiental with data: {medicion_data.dict()}")
             return result
             
@@ -172,6 +378,7 @@ class DatabaseService:
     
     async def create_mortalidad(self, mortalidad_data: MortalidadCreate) -> Dict[str, Any]:
         """Create a new mortality record"""
+        await self._check_lote(mortalidad_data.lote_id)
         try:
             # TODO: Replace with actual database insertion
             mock_id = 1
@@ -180,6 +387,8 @@ class DatabaseService:
                 **mortalidad_data.dict(),
                 "created_at": datetime.now()
             }
+            kpi_engine.record_mortalidad(result)
+            version_tracker.bump(result["lote_id"], "mortalidad")
             logger.info(f"Created mortalidad with data: {mortalidad_data.dict()}")
             return result
             
@@ -189,21 +398,122 @@ class DatabaseService:
     
     async def create_mapa_termico(self, mapa_data: MapaTermicoCreate) -> Dict[str, Any]:
         """Create a new thermal map record"""
+        await self._check_lote(mapa_data.lote_id)
         try:
             # TODO: Replace with actual database insertion
-            # Note: temperaturas is a 2D array, may need special handling depending on database
+            # Note: the grid itself is kept by thermal_store as keyframes and
+            # compressed deltas; the table only needs the frame metadata
             mock_id = 1
             result = {
                 "mapa_id": mock_id,
                 **mapa_data.dict(),
                 "created_at": datetime.now()
             }
+            result["almacenamiento"] = thermal_store.add_frame(result)
+            partitioned_storage.insert_mapa_termico(result)
+            version_tracker.bump(result["lote_id"], "mapa_termico")
             logger.info(f"Created mapa_termico with data: {mapa_data.dict()}")
             return result
             
         except Exception as e:
             logger.error(f"Error creating mapa_termico: {str(e)}")
             raise
+    
+    async def bulk_create(self, table: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Insert many already-validated rows (the .dict() of their *Create schema)
+        into consumo, alimentacion, mortalidad or crecimiento at once.
+        Used for historical backfill, so rows for lotes that are no longer
+        activo are accepted; only unknown lotes are rejected, reported by
+        their position in `rows`.
+        """
+        if table not in BULK_SCHEMAS:
+            raise ValueError(f"Bulk insert not supported for table {table}")
+        
+        errors = await self._lote_errors([row["lote_id"] for row in rows])
+        unknown = {
+            lote_id for lote_id, error in errors.items()
+            if isinstance(error, UnknownReferenceError)
+        }
+        valid = [row for row in rows if row["lote_id"] not in unknown]
+        rechazados = [
+            {"indice": indice, "lote_id": row["lote_id"], "error": str(errors[row["lote_id"]])}
+            for indice, row in enumerate(rows) if row["lote_id"] in unknown
+        ]
+        
+        try:
+            # TODO: Replace with actual database insertion
+            # Example (PostgreSQL): COPY consumo (lote_id, fecha_hora, ...) FROM STDIN
+            # or a single INSERT ... VALUES (...), (...) per chunk
+            for row in valid:
+                if table == "consumo":
+                    partitioned_storage.insert("consumo", row)
+                    kpi_engine.record_consumo(row)
+                elif table == "alimentacion":
+                    kpi_engine.record_alimentacion(row)
+                elif table == "mortalidad":
+                    kpi_engine.record_mortalidad(row)
+                else:
+                    kpi_engine.record_crecimiento(row)
+            version_tracker.bump_many((row["lote_id"] for row in valid), table)
+            logger.info(f"Bulk created {len(valid)} {table} rows")
+            return {"creados": len(valid), "rechazados": rechazados}
+            
+        except Exception as e:
+            logger.error(f"Error bulk creating {table}: {str(e)}")
+            raise
+    
+    async def usuario_exists(self, usuario_id: int) -> bool:
+        """Check whether a user exists"""
+        if reference_cache.has_usuario(usuario_id):
+            return True
+        return await self.get_usuario(usuario_id) is not None
+    
+    async def get_granjas_by_usuario(self, usuario_id: int) -> List[Dict[str, Any]]:
+        """All farms of a user"""
+        # TODO: Replace with actual database query
+        # Example SQL: SELECT granja_id, usuario_id, capacidad FROM granja WHERE usuario_id = %s
+        return [asdict(ref) for ref in reference_cache.granjas_by_usuario(usuario_id)]
+    
+    async def get_lotes_by_granjas(self, granja_ids: List[int]) -> List[Dict[str, Any]]:
+        """All batches/lots of several farms in one query"""
+        # TODO: Replace with actual database query
+        # Example SQL: SELECT lote_id, granja_id, nave_id, estado, cantidad_inicial
+        #              FROM lote WHERE granja_id = ANY(%s)
+        grouped = reference_cache.lotes_by_granja(granja_ids)
+        return [asdict(ref) for refs in grouped.values() for ref in refs]
+    
+    async def get_latest_mediciones(self, lote_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Latest environmental measurement of each lote"""
+        # TODO: Replace with actual database query
+        # Example SQL: SELECT DISTINCT ON (lote_id) * FROM medicion_ambiental
+        #              WHERE lote_id = ANY(%s) ORDER BY lote_id, fecha_hora DESC
+        return partitioned_storage.latest("medicion_ambiental", lote_ids)
+    
+    async def get_current_kpis(self, lote_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Current KPIs of each lote"""
+        kpis = {}
+        for lote_id in lote_ids:
+            current = kpi_engine.current(lote_id)
+            if current is not None:
+                kpis[lote_id] = current
+        return kpis
+    
+    async def count_alerts_by_lote(self, lote_ids: Iterable[int]) -> Dict[int, Dict[str, int]]:
+        """Alert counts per lote and severity"""
+        # Example SQL once alerts are persisted:
+        #   SELECT lote_id, severidad, count(*) FROM alerta
+        #   WHERE lote_id = ANY(%s) GROUP BY lote_id, severidad
+        return anomaly_detector.count_alerts(lote_ids)
+
+
+# Tables that support bulk_create, with the schema their rows are validated against
+BULK_SCHEMAS = {
+    "consumo": ConsumoCreate,
+    "alimentacion": AlimentacionCreate,
+    "mortalidad": MortalidadCreate,
+    "crecimiento": CrecimientoCreate,
+}
 
 
 # Create a singleton instance
@@ -219,10 +529,18 @@ async def create_granja(granja_data: GranjaCreate) -> Dict[str, Any]:
     return await db_service.create_granja(granja_data)
 
 
+async def create_nave(nave_data: NaveCreate) -> Dict[str, Any]:
+    return await db_service.create_nave(nave_data)
+
+
 async def create_lote(lote_data: LoteCreate) -> Dict[str, Any]:
     return await db_service.create_lote(lote_data)
 
 
+async def update_lote_estado(lote_id: int, estado: EstadoLote) -> Dict[str, Any]:
+    return await db_service.update_lote_estado(lote_id, estado)
+
+
 async def create_pollo(pollo_data: PolloCreate) -> Dict[str, Any]:
     return await db_service.create_pollo(pollo_data)
 
@@ -243,9 +561,17 @@ async def create_medicion_ambiental(medicion_data: MedicionAmbientalCreate) -> D
     return await db_service.create_medicion_ambiental(medicion_data)
 
 
+async def create_mediciones_ambientales(mediciones: List[MedicionAmbientalCreate]) -> Dict[str, Any]:
+    return await db_service.create_mediciones_ambientales(mediciones)
+
+
 async def create_mortalidad(mortalidad_data: MortalidadCreate) -> Dict[str, Any]:
     return await db_service.create_mortalidad(mortalidad_data)
 
 
 async def create_mapa_termico(mapa_data: MapaTermicoCreate) -> Dict[str, Any]:
-    return await db_service.create_mapa_termico(mapa_data)
\ No newline at end of file
+    return await db_service.create_mapa_termico(mapa_data)
+
+
+async def bulk_create(table: str, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return await db_service.bulk_create(table, rows)
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""
+Spatial interpolation service for poultry management system
+This module builds mapa_termico-shaped heatmaps per nave from point sensor readings
+"""
+
+import logging
+from typing import Optional, Dict, Any, List, Tuple
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.timeutils import to_utc_naive
+from app.services.versions import version_tracker, NAVE_MAP_TABLES
+
+logger = logging.getLogger(__name__)
+
+Coordinate = Tuple[float, float]
+
+
+def parse_ubicacion(ubicacion: Optional[str]) -> Optional[Coordinate]:
+    """
+    Parse a sensor position from medicion_ambiental.ubicacion.
+    Positions are given as "x,y" in meters from a corner of the nave;
+    free-text locations are not usable for interpolation and return None.
+    """
+    if not ubicacion:
+        return None
+    parts = ubicacion.replace(";", ",").split(",")
+    if len(parts) != 2:
+        return None
+    try:
+        return float(parts[0]), float(parts[1])
+    except ValueError:
+        return None
+
+
+class SpatialInterpolator:
+    """
+    Inverse distance weighting of the latest temperatura per sensor onto a grid.
+    The weight matrix only depends on the sensor layout, so it is computed once
+    per layout and each refresh is a single matrix-vector product. Interpolated
+    maps are cached until a new reading arrives for the nave. Sensors more than
+    INTERPOLATION_MAX_SENSOR_AGE_SECONDS behind the newest reading are left out.
+    """
+
+    def __init__(self):
+        self._lote_naves: Dict[int, int] = {}
+        self._readings: Dict[int, Dict[Coordinate, Tuple[float, datetime]]] = {}
+        self._weights: Dict[int, Tuple[Tuple[Coordinate, ...], np.ndarray, Dict[str, float]]] = {}
+        self._maps: Dict[int, Dict[str, Any]] = {}
+
+    def register_lote(self, lote: Dict[str, Any]) -> None:
+        """Remember which nave a lote is housed in"""
+        if lote.get("nave_id"):
+            self._lote_naves[lote["lote_id"]] = lote["nave_id"]
+
+    def lote_ids(self, nave_id: int) -> List[int]:
+        """Lotes housed in a nave"""
+        return [lote_id for lote_id, nave in self._lote_naves.items() if nave == nave_id]
+
+    def record_medicion(self, medicion: Dict[str, Any]) -> None:
+        """Keep the latest temperatura of the sensor and invalidate the nave map"""
+        nave_id = self._lote_naves.get(medicion["lote_id"])
+        posicion = parse_ubicacion(medicion.get("ubicacion"))
+        if nave_id is None or posicion is None:
+            return
+
+        fecha = to_utc_naive(medicion["fecha_hora"])
+        sensores = self._readings.setdefault(nave_id, {})
+        previous = sensores.get(posicion)
+        if previous is not None and previous[1] > fecha:
+            return
+        sensores[posicion] = (medicion["temperatura"], fecha)
+        self._maps.pop(nave_id, None)
+
+    def _build_weights(self, layout: Tuple[Coordinate, ...]) -> Tuple[np.ndarray, Dict[str, float]]:
+        """Compute the (cells x sensors) IDW weight matrix for a sensor layout"""
+        rows, cols = settings.INTERPOLATION_GRID_ROWS, settings.INTERPOLATION_GRID_COLS
+        sensors = np.asarray(layout, dtype=float)
+
+        x_min, y_min = sensors.min(axis=0)
+        x_max, y_max = sensors.max(axis=0)
+        # Give degenerate layouts (one sensor, or sensors on a line) some extent
+        if x_max - x_min < 1:
+            x_min, x_max = x_min - 0.5, x_max + 0.5
+        if y_max - y_min < 1:
+            y_min, y_max = y_min - 0.5, y_max + 0.5
+
+        # Cell centers, row-major, with rows along y and columns along x
+        xs = x_min + (np.arange(cols) + 0.5) * (x_max - x_min) / cols
+        ys = y_min + (np.arange(rows) + 0.5) * (y_max - y_min) / rows
+        gx, gy = np.meshgrid(xs, ys)
+        cells = np.column_stack([gx.ravel(), gy.ravel()])
+
+        distances = np.linalg.norm(cells[:, None, :] - sensors[None, :, :], axis=2)
+        exact = distances < 1e-9
+        with np.errstate(divide="ignore"):
+            weights = 1.0 / distances ** settings.INTERPOLATION_IDW_POWER
+        # A cell sitting on a sensor takes that sensor's value
+        on_sensor = exact.any(axis=1)
+        weights[on_sensor] = exact[on_sensor].astype(float)
+        weights /= weights.sum(axis=1, keepdims=True)
+
+        extent = {
+            "x_min": float(x_min), "x_max": float(x_max),
+            "y_min": float(y_min), "y_max": float(y_max),
+        }
+        return weights, extent
+
+    def get_map(self, nave_id: int) -> Optional[Dict[str, Any]]:
+        """Return the interpolated heatmap of a nave, or None without readings"""
+        cached = self._maps.get(nave_id)
+        if cached is not None:
+            return cached
+
+        sensores = self._readings.get(nave_id)
+        if not sensores:
+            return None
+
+        # Forget sensors that stopped reporting, so a removed or dead sensor
+        # does not keep pulling the map towards its last value
+        newest = max(fecha for _, fecha in sensores.values())
+        cutoff = newest - timedelta(seconds=settings.INTERPOLATION_MAX_SENSOR_AGE_SECONDS)
+        for posicion in [p for p, (_, fecha) in sensores.items() if fecha < cutoff]:
+            del sensores[posicion]
+
+        layout = tuple(sorted(sensores))
+        entry = self._weights.get(nave_id)
+        if entry is None or entry[0] != layout:
+            weights, extent = self._build_weights(layout)
+            self._weights[nave_id] = (layout, weights, extent)
+            logger.info(f"Built interpolation weights for nave {nave_id} ({len(layout)} sensors)")
+        else:
+            _, weights, extent = entry
+
+        values = np.fromiter((sensores[p][0] for p in layout), dtype=float, count=len(layout))
+        grid = (weights @ values).reshape(
+            settings.INTERPOLATION_GRID_ROWS, settings.INTERPOLATION_GRID_COLS
+        )
+
+        result = {
+            "nave_id": nave_id,
+            "fecha": newest,
+            "temperaturas": np.round(grid, 2).tolist(),
+            "sensores": len(layout),
+            "extension": extent,
+            "interpolado": True,
+        }
+        self._maps[nave_id] = result
+        return result
+
+
+# Create a singleton instance
+spatial_interpolator = SpatialInterpolator()
+
+
+# Convenience functions for easy imports
+def get_interpolated_map(nave_id: int) -> Optional[Dict[str, Any]]:
+    return spatial_interpolator.get_map(nave_id)
+
+
+def get_interpolated_map_etag(nave_id: int) -> str:
+    return version_tracker.etag(spatial_interpolator.lote_ids(nave_id), NAVE_MAP_TABLES)
@@ -0,0 +1,217 @@
+"""
+KPI engine for poultry management system
+This module maintains per-lote daily KPIs incrementally as records are inserted
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any
+from datetime import datetime, date
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _DailyTotals:
+    """Increments recorded for a single lote on a single day"""
+    alimento_consumido: float = 0.0  # kg, from consumo
+    alimento_suministrado: float = 0.0  # kg, from alimentacion
+    agua: float = 0.0  # liters, from consumo
+    muertes: int = 0
+    peso_promedio: Optional[float] = None  # grams, last crecimiento of the day
+
+
+@dataclass
+class _LoteState:
+    """Running totals for a lote, updated on every relevant insert"""
+    lote_id: int
+    fecha_ingreso: date
+    cantidad_inicial: int
+    nave_id: Optional[int] = None
+    alimento_consumido: float = 0.0
+    alimento_suministrado: float = 0.0
+    agua: float = 0.0
+    muertes: int = 0
+    peso_promedio: Optional[float] = None
+    fecha_peso: Optional[date] = None
+    dias: Dict[date, _DailyTotals] = field(default_factory=dict)
+
+    def day(self, fecha: date) -> _DailyTotals:
+        totals = self.dias.get(fecha)
+        if totals is None:
+            totals = self.dias[fecha] = _DailyTotals()
+        return totals
+
+
+def _as_date(value: Any) -> date:
+    """Normalize a date or datetime field to a date"""
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+class KPIEngine:
+    """
+    Keeps feed conversion, mortality, density and water:feed KPIs per lote.
+    Each insert only touches the running totals of its lote and the bucket
+    of its day, so serving the KPIs never needs to rescan the source tables.
+    """
+
+    def __init__(self):
+        self._lotes: Dict[int, _LoteState] = {}
+        self._nave_areas: Dict[int, float] = {}
+
+    def register_nave(self, nave: Dict[str, Any]) -> None:
+        """Record the floor area of a nave for density calculations"""
+        self._nave_areas[nave["nave_id"]] = nave["area"]
+
+    def register_lote(self, lote: Dict[str, Any]) -> None:
+        """Start tracking a lote (keeps accumulated totals if already known)"""
+        state = self._lotes.get(lote["lote_id"])
+        if state is None:
+            self._lotes[lote["lote_id"]] = _LoteState(
+                lote_id=lote["lote_id"],
+                fecha_ingreso=lote["fecha_ingreso"],
+                cantidad_inicial=lote["cantidad_inicial"],
+                nave_id=lote.get("nave_id"),
+            )
+        else:
+            state.fecha_ingreso = lote["fecha_ingreso"]
+            state.cantidad_inicial = lote["cantidad_inicial"]
+            state.nave_id = lote.get("nave_id")
+
+    def _state(self, lote_id: int) -> Optional[_LoteState]:
+        state = self._lotes.get(lote_id)
+        if state is None:
+            logger.warning(f"KPI update skipped for unknown lote {lote_id}")
+        return state
+
+    def record_consumo(self, consumo: Dict[str, Any]) -> None:
+        """Add a consumption record to the feed and water totals"""
+        state = self._state(consumo["lote_id"])
+        if state is None:
+            return
+        day = state.day(_as_date(consumo["fecha_hora"]))
+        state.alimento_consumido += consumo["cantidad_alimento"]
+        state.agua += consumo["cantidad_agua"]
+        day.alimento_consumido += consumo["cantidad_alimento"]
+        day.agua += consumo["cantidad_agua"]
+
+    def record_alimentacion(self, alimentacion: Dict[str, Any]) -> None:
+        """Add a feeding record to the supplied feed totals"""
+        state = self._state(alimentacion["lote_id"])
+        if state is None:
+            return
+        day = state.day(_as_date(alimentacion["fecha"]))
+        state.alimento_suministrado += alimentacion["cantidad_suministrada"]
+        day.alimento_suministrado += alimentacion["cantidad_suministrada"]
+
+    def record_mortalidad(self, mortalidad: Dict[str, Any]) -> None:
+        """Add a mortality record to the death totals"""
+        state = self._state(mortalidad["lote_id"])
+        if state is None:
+            return
+        day = state.day(_as_date(mortalidad["fecha"]))
+        state.muertes += mortalidad["cantidad"]
+        day.muertes += mortalidad["cantidad"]
+
+    def record_crecimiento(self, crecimiento: Dict[str, Any]) -> None:
+        """Update the latest average weight of the lote"""
+        state = self._state(crecimiento["lote_id"])
+        if state is None:
+            return
+        fecha = _as_date(crecimiento["fecha"])
+        state.day(fecha).peso_promedio = crecimiento["peso_promedio"]
+        if state.fecha_peso is None or fecha >= state.fecha_peso:
+            state.peso_promedio = crecimiento["peso_promedio"]
+            state.fecha_peso = fecha
+
+    def _kpis(
+        self,
+        state: _LoteState,
+        alimento_consumido: float,
+        alimento_suministrado: float,
+        agua: float,
+        muertes: int,
+        peso_promedio: Optional[float],
+    ) -> Dict[str, Any]:
+        """Derive the KPI values from a set of cumulative totals"""
+        aves_vivas = max(state.cantidad_inicial - muertes, 0)
+        # Measured intake is preferred; supplied feed is the fallback
+        alimento = alimento_consumido or alimento_suministrado
+
+        conversion = None
+        if peso_promedio and aves_vivas and alimento:
+            biomasa = aves_vivas * peso_promedio / 1000  # kg of live weight
+            conversion = round(alimento / biomasa, 3)
+
+        area = self._nave_areas.get(state.nave_id) if state.nave_id else None
+
+        return {
+            "aves_vivas": aves_vivas,
+            "mortalidad_acumulada": muertes,
+            "mortalidad_pct": round(100 * muertes / state.cantidad_inicial, 2),
+            "peso_promedio": peso_promedio,
+            "alimento_kg": round(alimento, 3),
+            "agua_l": round(agua, 3),
+            "conversion_alimenticia": conversion,
+            "densidad_aves_m2": round(aves_vivas / area, 2) if area else None,
+            "relacion_agua_alimento": (
+                round(agua / alimento_consumido, 3) if alimento_consumido else None
+            ),
+        }
+
+    def current(self, lote_id: int) -> Optional[Dict[str, Any]]:
+        """Return the current KPIs of a lote from its running totals only"""
+        state = self._lotes.get(lote_id)
+        if state is None:
+            return None
+        return self._kpis(
+            state,
+            state.alimento_consumido,
+            state.alimento_suministrado,
+            state.agua,
+            state.muertes,
+            state.peso_promedio,
+        )
+
+    def get_kpis(self, lote_id: int) -> Optional[Dict[str, Any]]:
+        """Return the current KPIs and the daily series for a lote"""
+        state = self._lotes.get(lote_id)
+        if state is None:
+            return None
+
+        diario = []
+        consumido = suministrado = agua = 0.0
+        muertes = 0
+        peso = None
+        for fecha in sorted(state.dias):
+            totals = state.dias[fecha]
+            consumido += totals.alimento_consumido
+            suministrado += totals.alimento_suministrado
+            agua += totals.agua
+            muertes += totals.muertes
+            if totals.peso_promedio is not None:
+                peso = totals.peso_promedio
+            diario.append({
+                "fecha": fecha,
+                **self._kpis(state, consumido, suministrado, agua, muertes, peso),
+            })
+
+        return {
+            "lote_id": lote_id,
+            "fecha_ingreso": state.fecha_ingreso,
+            "cantidad_inicial": state.cantidad_inicial,
+            "nave_id": state.nave_id,
+            **self.current(lote_id),
+            "diario": diario,
+        }
+
+
+# Create a singleton instance
+kpi_engine = KPIEngine()
+
+
+# Convenience functions for easy imports
+def get_lote_kpis(lote_id: int) -> Optional[Dict[str, Any]]:
+    return kpi_engine.get_kpis(lote_id)
@@ -0,0 +1,137 @@
+"""
+Hierarchical overview service for poultry management system
+This module summarizes all granjas, naves and lotes of a usuario in one response
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional, Dict, Any, List, Tuple
+from datetime import datetime
+
+from app.core.config import settings
+from app.services.database import db_service
+from app.services.references import reference_cache
+from app.services.versions import version_tracker, OVERVIEW_TABLES
+
+logger = logging.getLogger(__name__)
+
+_AMBIENTE_FIELDS = ("fecha_hora", "temperatura", "humedad", "co2", "amoniaco", "iluminacion")
+
+
+def _sum_alerts(counts: List[Dict[str, int]]) -> Dict[str, int]:
+    total: Dict[str, int] = {}
+    for count in counts:
+        for severidad, n in count.items():
+            total[severidad] = total.get(severidad, 0) + n
+    return total
+
+
+class OverviewService:
+    """
+    Builds a usuario's farm/nave/lote tree with a fixed number of grouped
+    reads instead of one request per farm and lote. KPIs, latest readings and
+    alert counts do not depend on each other and are fetched concurrently.
+    Results are cached for OVERVIEW_CACHE_TTL_SECONDS, or until any lote of the
+    usuario changes.
+    """
+
+    def __init__(self):
+        self._cache: Dict[int, Tuple[float, str, Dict[str, Any]]] = {}
+
+    def etag(self, usuario_id: int) -> str:
+        """Version of a usuario's overview, from in-memory counters only"""
+        return version_tracker.etag(
+            reference_cache.lote_ids_by_usuario(usuario_id),
+            OVERVIEW_TABLES,
+            ("usuario", "granja", "nave"),
+        )
+
+    async def get_overview(self, usuario_id: int, etag: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the overview of a usuario, or None if the usuario does not exist.
+        Pass the ETag when the caller already computed it for this request.
+        """
+        etag = etag or self.etag(usuario_id)
+        cached = self._cache.get(usuario_id)
+        if cached is not None and cached[0] > time.monotonic() and cached[1] == etag:
+            return cached[2]
+
+        if not await db_service.usuario_exists(usuario_id):
+            return None
+
+        granjas = await db_service.get_granjas_by_usuario(usuario_id)
+        lotes = await db_service.get_lotes_by_granjas([g["granja_id"] for g in granjas])
+        lote_ids = [lote["lote_id"] for lote in lotes]
+
+        kpis, mediciones, alertas = await asyncio.gather(
+            db_service.get_current_kpis(lote_ids),
+            db_service.get_latest_mediciones(lote_ids),
+            db_service.count_alerts_by_lote(lote_ids),
+        )
+
+        lotes_by_granja: Dict[int, List[Dict[str, Any]]] = {g["granja_id"]: [] for g in granjas}
+        for lote in lotes:
+            lote_id = lote["lote_id"]
+            medicion = mediciones.get(lote_id)
+            lotes_by_granja[lote["granja_id"]].append({
+                "lote_id": lote_id,
+                "nave_id": lote["nave_id"],
+                "estado": lote["estado"],
+                "cantidad_inicial": lote["cantidad_inicial"],
+                "kpis": kpis.get(lote_id),
+                "ambiente": (
+                    {field: medicion.get(field) for field in _AMBIENTE_FIELDS}
+                    if medicion else None
+                ),
+                "alertas": alertas[lote_id],
+            })
+
+        resumen_granjas = []
+        for granja in granjas:
+            granja_lotes = lotes_by_granja[granja["granja_id"]]
+
+            naves: Dict[int, Dict[str, Any]] = {}
+            for lote in granja_lotes:
+                if lote["nave_id"] is None:
+                    continue
+                nave = naves.setdefault(lote["nave_id"], {
+                    "nave_id": lote["nave_id"], "lote_ids": [], "aves_vivas": 0, "alertas": []
+                })
+                nave["lote_ids"].append(lote["lote_id"])
+                nave["aves_vivas"] += lote["kpis"]["aves_vivas"] if lote["kpis"] else 0
+                nave["alertas"].append(lote["alertas"])
+            for nave in naves.values():
+                nave["alertas"] = _sum_alerts(nave["alertas"])
+
+            resumen_granjas.append({
+                "granja_id": granja["granja_id"],
+                "capacidad": granja["capacidad"],
+                "lotes_activos": sum(1 for lote in granja_lotes if lote["estado"] == "activo"),
+                "aves_vivas": sum(lote["kpis"]["aves_vivas"] for lote in granja_lotes if lote["kpis"]),
+                "alertas": _sum_alerts([lote["alertas"] for lote in granja_lotes]),
+                "naves": list(naves.values()),
+                "lotes": granja_lotes,
+            })
+
+        result = {
+            "usuario_id": usuario_id,
+            "generado": datetime.now(),
+            "granjas": resumen_granjas,
+            "alertas": _sum_alerts([g["alertas"] for g in resumen_granjas]),
+        }
+        self._cache[usuario_id] = (time.monotonic() + settings.OVERVIEW_CACHE_TTL_SECONDS, etag, result)
+        return result
+
+
+# Create a singleton instance
+overview_service = OverviewService()
+
+
+# Convenience functions for easy imports
+async def get_usuario_overview(usuario_id: int, etag: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    return await overview_service.get_overview(usuario_id, etag)
+
+
+def get_usuario_overview_etag(usuario_id: int) -> str:
+    return overview_service.etag(usuario_id)
@@ -0,0 +1,170 @@
+"""
+Foreign-key resolution cache for the write path
+This module keeps the valid lotes, granjas and usuarios in memory so inserts
+can check their parent without a database round trip
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, Iterable, List, Set
+
+from app.models.schemas import EstadoLote
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidReferenceError(ValueError):
+    """A record points to a parent that cannot accept it"""
+
+
+class UnknownReferenceError(InvalidReferenceError):
+    """The referenced parent does not exist"""
+
+
+class InactiveReferenceError(InvalidReferenceError):
+    """The referenced lote exists but is not activo"""
+
+
+@dataclass
+class LoteRef:
+    lote_id: int
+    granja_id: int
+    estado: EstadoLote
+    cantidad_inicial: int
+    nave_id: Optional[int] = None
+
+
+@dataclass
+class GranjaRef:
+    granja_id: int
+    usuario_id: int
+    capacidad: int
+
+
+class ReferenceCache:
+    """
+    In-process copy of the parent rows that ingest records point to.
+    It is filled at startup and kept current by create_lote, create_granja,
+    create_usuario and lote estado changes, so a valid reading never waits on
+    the database and readings for closed lotes fail early. Unknown parents
+    are only rejected with REJECT_UNKNOWN_REFERENCES, but an estado change
+    of an uncached lote is still recorded and enforced.
+    """
+
+    def __init__(self):
+        self._lotes: Dict[int, LoteRef] = {}
+        self._granjas: Dict[int, GranjaRef] = {}
+        self._usuarios: Set[int] = set()
+        # Parent -> children indexes, so per-usuario reads never scan the cache
+        self._granjas_by_usuario: Dict[int, Set[int]] = {}
+        self._lotes_by_granja: Dict[int, Set[int]] = {}
+        # Estado changes of lotes that are not cached, so a lote closed
+        # through the API still rejects readings without a database row
+        self._estados: Dict[int, EstadoLote] = {}
+
+    def load(
+        self,
+        usuarios: Iterable[Dict[str, Any]],
+        granjas: Iterable[Dict[str, Any]],
+        lotes: Iterable[Dict[str, Any]],
+    ) -> None:
+        """Replace the cache contents with rows read from the database"""
+        self._usuarios = {u["usuario_id"] for u in usuarios}
+        self._granjas = {}
+        self._lotes = {}
+        self._granjas_by_usuario = {}
+        self._lotes_by_granja = {}
+        self._estados = {}
+        for granja in granjas:
+            self.put_granja(granja)
+        for lote in lotes:
+            self.put_lote(lote)
+        logger.info(
+            f"Reference cache loaded: {len(self._usuarios)} usuarios, "
+            f"{len(self._granjas)} granjas, {len(self._lotes)} lotes"
+        )
+
+    def put_usuario(self, usuario: Dict[str, Any]) -> None:
+        self._usuarios.add(usuario["usuario_id"])
+
+    def put_granja(self, granja: Dict[str, Any]) -> None:
+        previous = self._granjas.get(granja["granja_id"])
+        if previous is not None:
+            self._granjas_by_usuario[previous.usuario_id].discard(previous.granja_id)
+        self._granjas[granja["granja_id"]] = GranjaRef(
+            granja_id=granja["granja_id"],
+            usuario_id=granja["usuario_id"],
+            capacidad=granja["capacidad"],
+        )
+        self._granjas_by_usuario.setdefault(granja["usuario_id"], set()).add(granja["granja_id"])
+
+    def put_lote(self, lote: Dict[str, Any]) -> None:
+        previous = self._lotes.get(lote["lote_id"])
+        if previous is not None:
+            self._lotes_by_granja[previous.granja_id].discard(previous.lote_id)
+        self._lotes[lote["lote_id"]] = LoteRef(
+            lote_id=lote["lote_id"],
+            granja_id=lote["granja_id"],
+            estado=EstadoLote(lote["estado"]),
+            cantidad_inicial=lote["cantidad_inicial"],
+            nave_id=lote.get("nave_id"),
+        )
+        self._lotes_by_granja.setdefault(lote["granja_id"], set()).add(lote["lote_id"])
+        self._estados.pop(lote["lote_id"], None)
+
+    def set_lote_estado(self, lote_id: int, estado: EstadoLote) -> None:
+        ref = self._lotes.get(lote_id)
+        if ref is not None:
+            ref.estado = estado
+        else:
+            self._estados[lote_id] = estado
+
+    def has_usuario(self, usuario_id: int) -> bool:
+        return usuario_id in self._usuarios
+
+    def get_granja(self, granja_id: int) -> Optional[GranjaRef]:
+        return self._granjas.get(granja_id)
+
+    def get_lote(self, lote_id: int) -> Optional[LoteRef]:
+        return self._lotes.get(lote_id)
+
+    def granjas_by_usuario(self, usuario_id: int) -> List[GranjaRef]:
+        return [self._granjas[g] for g in sorted(self._granjas_by_usuario.get(usuario_id, ()))]
+
+    def lotes_by_granja(self, granja_ids: Iterable[int]) -> Dict[int, List[LoteRef]]:
+        """Group the lotes of several granjas"""
+        return {
+            granja_id: [self._lotes[l] for l in sorted(self._lotes_by_granja.get(granja_id, ()))]
+            for granja_id in granja_ids
+        }
+
+    def lote_ids_by_usuario(self, usuario_id: int) -> List[int]:
+        """Ids of every lote in the granjas of a usuario"""
+        return [
+            lote_id
+            for granja_id in self._granjas_by_usuario.get(usuario_id, ())
+            for lote_id in self._lotes_by_granja.get(granja_id, ())
+        ]
+
+    def lote_error(self, lote_id: int) -> Optional[InvalidReferenceError]:
+        """Return why records cannot be added to a lote, or None if they can"""
+        ref = self._lotes.get(lote_id)
+        estado = ref.estado if ref is not None else self._estados.get(lote_id)
+        if estado is not None and estado != EstadoLote.ACTIVO:
+            return InactiveReferenceError(f"Lote {lote_id} is {estado.value}")
+        if ref is None:
+            return UnknownReferenceError(f"Lote {lote_id} not found")
+        return None
+
+    def check_lotes(self, lote_ids: Iterable[int]) -> Dict[int, InvalidReferenceError]:
+        """Validate a whole batch in one pass, returning the errors per lote_id"""
+        errors = {}
+        for lote_id in set(lote_ids):
+            error = self.lote_error(lote_id)
+            if error is not None:
+                errors[lote_id] = error
+        return errors
+
+
+# Create a singleton instance
+reference_cache = ReferenceCache()
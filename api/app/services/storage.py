@@ -0,0 +1,334 @@
+"""
+Time-partitioned storage for high-volume tables
+This module tracks the monthly partitions of raw rows and ages them out by retention policy
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+from dataclasses import dataclass
+from enum import Enum
+from itertools import islice
+from pathlib import Path
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Tuple
+from datetime import datetime, date, timedelta
+
+from app.core.config import settings
+from app.core.timeutils import to_utc_naive, utc_now
+from app.services.thermal_storage import thermal_store
+from app.services.versions import version_tracker
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet archives are optional; fall back to gzip NDJSON
+    pa = None
+    pq = None
+
+Month = Tuple[int, int]
+Daily = Dict[Tuple[int, date], Dict[str, "_Aggregate"]]
+
+# Records per Parquet row group; at most one group is held in memory while archiving
+_ARCHIVE_BATCH_ROWS = 1024
+
+
+@dataclass(frozen=True)
+class _TablePolicy:
+    time_field: str
+    retention_setting: str
+    rollup_fields: Tuple[str, ...]
+
+
+# Partitioned tables, the column they are partitioned on and the numeric
+# columns that survive expiry as daily aggregates
+_POLICIES: Dict[str, _TablePolicy] = {
+    "medicion_ambiental": _TablePolicy(
+        "fecha_hora", "RETENTION_MEDICION_AMBIENTAL_DAYS",
+        ("temperatura", "humedad", "co2", "amoniaco", "iluminacion"),
+    ),
+    "consumo": _TablePolicy(
+        "fecha_hora", "RETENTION_CONSUMO_DAYS",
+        ("cantidad_agua", "cantidad_alimento", "desperdicio", "kwh"),
+    ),
+    "mapa_termico": _TablePolicy(
+        "fecha", "RETENTION_MAPA_TERMICO_DAYS",
+        ("temperatura_media", "temperatura_min", "temperatura_max"),
+    ),
+}
+PARTITIONED_TABLES = tuple(_POLICIES)
+
+
+def _month_of(value: Any) -> Month:
+    return value.year, value.month
+
+
+def _month_end(month: Month) -> date:
+    """First day after the month, i.e. its exclusive upper bound"""
+    year, m = month
+    return date(year + 1, 1, 1) if m == 12 else date(year, m + 1, 1)
+
+
+def _plain(value: Any) -> Any:
+    """Convert enum members to their values for archiving"""
+    return value.value if isinstance(value, Enum) else value
+
+
+class _Aggregate:
+    """count/sum/min/max accumulator for one column of a daily rollup"""
+
+    __slots__ = ("count", "total", "minimum", "maximum")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+    def merge(self, other: "_Aggregate") -> None:
+        self.count += other.count
+        self.total += other.total
+        for value in (other.minimum, other.maximum):
+            if value is not None:
+                self.minimum = value if self.minimum is None else min(self.minimum, value)
+                self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "media": round(self.total / self.count, 3),
+            "min": self.minimum,
+            "max": self.maximum,
+            "suma": round(self.total, 3),
+            "n": self.count,
+        }
+
+
+def _merge_daily(target: Daily, daily: Daily) -> None:
+    """Add the aggregates of `daily` to those of the same (lote, day) in `target`"""
+    for key, aggregates in daily.items():
+        existing = target.setdefault(key, {})
+        for field, agg in aggregates.items():
+            if field in existing:
+                existing[field].merge(agg)
+            else:
+                existing[field] = agg
+
+
+def _write_parquet(path: Path, records: Iterator[Dict[str, Any]]) -> None:
+    """Write records as row groups, so only one group is ever materialized"""
+    schema = None
+    writer = None
+    try:
+        while True:
+            batch = list(islice(records, _ARCHIVE_BATCH_ROWS))
+            if not batch:
+                break
+            # Later groups are cast to the schema inferred from the first
+            table = pa.Table.from_pylist(batch, schema=schema)
+            if writer is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(path, schema, compression="zstd")
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        pq.write_table(pa.table({}), path)
+
+
+class TimePartitionedStorage:
+    """
+    Monthly partitions for medicion_ambiental, consumo and mapa_termico.
+    Raw rows are written by the database insert; this process only keeps the
+    row count of each partition, daily per-lote aggregates updated on insert
+    and the latest row of each lote, so its memory grows with lotes x days of
+    retention rather than with readings. A partition whose month is entirely
+    older than the table's retention is streamed to a compressed archive file,
+    its daily aggregates become the table's rollups and it is dropped as a
+    whole, never row by row.
+    """
+
+    def __init__(self):
+        self._counts: Dict[str, Dict[Month, int]] = {table: {} for table in _POLICIES}
+        # Daily aggregates of the partitions still within retention
+        self._daily: Dict[str, Dict[Month, Daily]] = {table: {} for table in _POLICIES}
+        # Daily aggregates of expired partitions. Rows archived by a later run
+        # are added to their day instead of replacing it
+        self._rollups: Dict[str, Daily] = {table: {} for table in _POLICIES}
+        self._latest: Dict[str, Dict[int, Dict[str, Any]]] = {
+            table: {} for table in _POLICIES
+        }
+
+    def insert(self, table: str, row: Dict[str, Any]) -> None:
+        """Account for a row stored in the partition of its month"""
+        policy = _POLICIES[table]
+        fecha = to_utc_naive(row[policy.time_field])
+        if fecha is not row[policy.time_field]:
+            row = {**row, policy.time_field: fecha}
+
+        latest = self._latest[table]
+        current = latest.get(row["lote_id"])
+        if current is None or fecha >= current[policy.time_field]:
+            latest[row["lote_id"]] = row
+
+        month = _month_of(fecha)
+        counts = self._counts[table]
+        counts[month] = counts.get(month, 0) + 1
+        day = fecha.date() if isinstance(fecha, datetime) else fecha
+        aggregates = self._daily[table].setdefault(month, {}).setdefault((row["lote_id"], day), {})
+        for field in policy.rollup_fields:
+            value = row.get(field)
+            if value is not None:
+                aggregates.setdefault(field, _Aggregate()).add(value)
+
+    def insert_mapa_termico(self, mapa: Dict[str, Any]) -> None:
+        """Store thermal map metadata; the grid itself lives in thermal_store"""
+        temperaturas = [t for row in mapa["temperaturas"] for t in row]
+        row = {k: v for k, v in mapa.items() if k not in ("temperaturas", "almacenamiento")}
+        row["temperatura_media"] = sum(temperaturas) / len(temperaturas)
+        row["temperatura_min"] = min(temperaturas)
+        row["temperatura_max"] = max(temperaturas)
+        self.insert("mapa_termico", row)
+
+    def latest(self, table: str, lote_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Most recent row of each lote, kept up to date on insert"""
+        latest = self._latest[table]
+        return {lote_id: latest[lote_id] for lote_id in lote_ids if lote_id in latest}
+
+    def partitions(self, table: str) -> Dict[Month, int]:
+        """Row counts per partition of a table"""
+        return dict(self._counts[table])
+
+    def get_rollups(self, table: str, lote_id: int) -> List[Dict[str, Any]]:
+        """Daily aggregates of a lote's expired rows, oldest first"""
+        rollups = self._rollups[table]
+        return [
+            {
+                "lote_id": lote_id,
+                "fecha": fecha,
+                **{field: agg.to_dict() for field, agg in rollups[(lote_id, fecha)].items()},
+            }
+            for key_lote, fecha in sorted(rollups)
+            if key_lote == lote_id
+        ]
+
+    def _partition_rows(self, table: str, month: Month) -> Iterator[Dict[str, Any]]:
+        """Stream the raw rows of a partition from the database"""
+        # TODO: Replace with an actual database query read through a server-side cursor
+        # Example SQL: SELECT * FROM medicion_ambiental_2024_01 ORDER BY fecha_hora
+        return iter(())
+
+    def _thermal_frames(self, lote_ids: Iterable[int], month: Month) -> Iterator[Dict[str, Any]]:
+        """Decode the grids of an expiring mapa_termico partition one frame at a time"""
+        start = datetime(month[0], month[1], 1)
+        end = datetime.combine(_month_end(month), datetime.min.time())
+        for lote_id in sorted(lote_ids):
+            yield from thermal_store.iter_frames(lote_id, start, end - timedelta.resolution)
+
+    def _archive(self, table: str, month: Month, records: Iterator[Dict[str, Any]]) -> Path:
+        """Stream a partition to a compressed file under ARCHIVE_DIR"""
+        directory = Path(settings.ARCHIVE_DIR) / table
+        directory.mkdir(parents=True, exist_ok=True)
+        name = f"{month[0]:04d}-{month[1]:02d}"
+        suffix = ".parquet" if pq is not None else ".ndjson.gz"
+        records = ({k: _plain(v) for k, v in record.items()} for record in records)
+
+        # Rows that arrive after a month was archived get their own file
+        path = directory / f"{name}{suffix}"
+        n = 1
+        while path.exists():
+            path = directory / f"{name}.{n}{suffix}"
+            n += 1
+
+        # Write under a temporary name so a failed write never looks archived
+        partial = path.with_name(path.name + ".partial")
+        if pq is not None:
+            _write_parquet(partial, records)
+        else:
+            with gzip.open(partial, "wt", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, default=str) + "\n")
+        partial.replace(path)
+        return path
+
+    async def enforce_retention(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Archive, roll up and drop every partition past its retention"""
+        now = to_utc_naive(now) if now else utc_now()
+        expired = []
+
+        for table, policy in _POLICIES.items():
+            cutoff = (now - timedelta(days=getattr(settings, policy.retention_setting))).date()
+            for month in sorted(self._counts[table]):
+                if _month_end(month) > cutoff:
+                    continue
+                try:
+                    result = await self._expire(table, month)
+                except Exception as e:
+                    # The partition is left in place and retried on the next run
+                    logger.error(f"Error archiving {table} {month[0]}-{month[1]:02d}: {str(e)}")
+                    continue
+                expired.append(result)
+
+        return expired
+
+    async def _expire(self, table: str, month: Month) -> Dict[str, Any]:
+        """Archive a partition, then roll it up and drop it"""
+        # Detach the partition's counters: rows that land while the archive is
+        # written start new ones and go out with the next run
+        count = self._counts[table].pop(month)
+        daily = self._daily[table].pop(month, {})
+        lote_ids = {lote_id for lote_id, _ in daily}
+        if table == "mapa_termico":
+            records = self._thermal_frames(lote_ids, month)
+        else:
+            records = self._partition_rows(table, month)
+
+        # Nothing is dropped until the archive has been written
+        try:
+            path = await asyncio.to_thread(self._archive, table, month, records)
+        except Exception:
+            counts = self._counts[table]
+            counts[month] = counts.get(month, 0) + count
+            _merge_daily(self._daily[table].setdefault(month, {}), daily)
+            raise
+
+        # TODO: Drop the partition in the database once it is archived
+        # Example SQL: ALTER TABLE medicion_ambiental DETACH PARTITION medicion_ambiental_2024_01;
+        #              DROP TABLE medicion_ambiental_2024_01
+        _merge_daily(self._rollups[table], daily)
+        if table == "mapa_termico":
+            for lote_id in lote_ids:
+                thermal_store.drop_before(
+                    lote_id, datetime.combine(_month_end(month), datetime.min.time())
+                )
+        # Reads of these lotes may have included the dropped rows
+        version_tracker.bump_many(lote_ids, table)
+
+        logger.info(f"Archived {count} {table} rows of {month[0]}-{month[1]:02d} to {path}")
+        return {"tabla": table, "mes": month, "filas": count, "archivo": str(path)}
+
+    async def run_retention(self) -> None:
+        """Periodically enforce retention; meant to run as a background task"""
+        while True:
+            try:
+                await self.enforce_retention()
+            except Exception as e:
+                logger.error(f"Error enforcing retention: {str(e)}")
+            await asyncio.sleep(settings.RETENTION_CHECK_INTERVAL_SECONDS)
+
+
+# Create a singleton instance
+partitioned_storage = TimePartitionedStorage()
+
+
+# Convenience functions for easy imports
+def get_daily_rollups(table: str, lote_id: int) -> List[Dict[str, Any]]:
+    return partitioned_storage.get_rollups(table, lote_id)
@@ -0,0 +1,248 @@
+"""
+Compressed thermal map storage for poultry management system
+This module stores mapa_termico frames as keyframes and quantized deltas
+"""
+
+import bisect
+import logging
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Tuple, Iterator
+from datetime import datetime
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.timeutils import to_utc_naive
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _EncodedFrame:
+    """A single stored frame: zlib-compressed int16 grid, full or delta"""
+    mapa_id: int
+    fecha: datetime
+    keyframe: bool
+    shape: Tuple[int, int]
+    payload: bytes
+
+
+class _FrameStream:
+    """
+    Frames of one camera in arrival order. Deltas are taken against the
+    previous frame in arrival order, and a sorted index maps timestamps
+    back to positions so out-of-order frames are still found by fecha.
+    Timestamps must already be normalized with to_utc_naive.
+    """
+
+    def __init__(self):
+        self.frames: List[_EncodedFrame] = []
+        self.keyframes: List[int] = []  # positions of keyframes
+        self.index: List[Tuple[datetime, int]] = []  # (fecha, position), sorted
+        self.last: Optional[np.ndarray] = None  # quantized last frame
+        # Playback runs in a worker thread while frames are added and dropped
+        # on the event loop; the lock keeps the three lists consistent
+        self.lock = threading.Lock()
+
+    def append(self, mapa_id: int, fecha: datetime, grid: np.ndarray) -> _EncodedFrame:
+        position = len(self.frames)
+        since_keyframe = position - self.keyframes[-1] if self.keyframes else None
+        keyframe = (
+            self.last is None
+            or self.last.shape != grid.shape
+            or since_keyframe >= settings.THERMAL_KEYFRAME_INTERVAL
+        )
+
+        data = grid if keyframe else grid - self.last
+        frame = _EncodedFrame(
+            mapa_id=mapa_id,
+            fecha=fecha,
+            keyframe=keyframe,
+            shape=grid.shape,
+            payload=zlib.compress(
+                data.astype(np.int16).tobytes(), settings.THERMAL_COMPRESSION_LEVEL
+            ),
+        )
+
+        # Everything that can fail happens above; the stream is only updated
+        # once the frame is fully encoded, so deltas never lose their base
+        entry = (fecha, position)
+        with self.lock:
+            slot = bisect.bisect_right(self.index, entry)
+            self.frames.append(frame)
+            if keyframe:
+                self.keyframes.append(position)
+            self.index.insert(slot, entry)
+        self.last = grid
+        return frame
+
+    def snapshot(self) -> "_FrameStream":
+        """
+        A consistent view of the stream for a long-running reader. drop_before
+        replaces the frame lists instead of shifting them in place and append
+        only extends them, so positions in the view stay valid while it is read.
+        """
+        view = _FrameStream()
+        with self.lock:
+            view.frames = self.frames
+            view.keyframes = self.keyframes
+            view.index = list(self.index)
+        return view
+
+    def truncate(self, cut: int) -> None:
+        """Drop the frames before position `cut`, which must be a keyframe"""
+        frames = self.frames[cut:]
+        keyframes = [p - cut for p in self.keyframes if p >= cut]
+        index = [(f, p - cut) for f, p in self.index if p >= cut]
+        with self.lock:
+            self.frames, self.keyframes, self.index = frames, keyframes, index
+
+    def decode(self, position: int, previous: Optional[Tuple[int, np.ndarray]] = None) -> np.ndarray:
+        """
+        Rebuild the quantized grid at a position. When the caller passes the
+        grid of the preceding position, a delta frame costs a single addition.
+        """
+        frame = self.frames[position]
+        if not frame.keyframe and previous is not None and previous[0] == position - 1:
+            start, grid = position, previous[1]
+        else:
+            start = self.keyframes[bisect.bisect_right(self.keyframes, position) - 1]
+            grid = None
+
+        for i in range(start, position + 1):
+            current = self.frames[i]
+            data = np.frombuffer(zlib.decompress(current.payload), dtype=np.int16)
+            data = data.reshape(current.shape).astype(np.int32)
+            grid = data if current.keyframe else grid + data
+        return grid
+
+
+def _to_response(frame: _EncodedFrame, lote_id: int, grid: np.ndarray) -> Dict[str, Any]:
+    return {
+        "mapa_id": frame.mapa_id,
+        "lote_id": lote_id,
+        "fecha": frame.fecha,
+        "temperaturas": np.round(grid * settings.THERMAL_QUANTIZATION, 2).tolist(),
+    }
+
+
+class ThermalMapStore:
+    """
+    Keyframe + delta storage for thermal camera frames, one stream per lote.
+    A full keyframe is kept every THERMAL_KEYFRAME_INTERVAL frames; frames in
+    between store the quantized difference to their predecessor, which is
+    mostly zeros and compresses very well.
+    """
+
+    def __init__(self):
+        self._streams: Dict[int, _FrameStream] = {}
+
+    def add_frame(self, mapa: Dict[str, Any]) -> Dict[str, Any]:
+        """Encode and store a frame, returning its storage statistics"""
+        grid = np.rint(
+            np.asarray(mapa["temperaturas"], dtype=float) / settings.THERMAL_QUANTIZATION
+        ).astype(np.int32)
+        if grid.ndim != 2 or grid.size == 0:
+            raise ValueError("temperaturas must be a non-empty grid with rows of equal length")
+        if np.abs(grid).max() > np.iinfo(np.int16).max // 2:
+            raise ValueError("temperaturas out of the storable range")
+
+        stream = self._streams.setdefault(mapa["lote_id"], _FrameStream())
+        frame = stream.append(mapa["mapa_id"], to_utc_naive(mapa["fecha"]), grid)
+        return {
+            "keyframe": frame.keyframe,
+            "bytes_raw": grid.size * 8,
+            "bytes_almacenados": len(frame.payload),
+        }
+
+    def get_frame(self, lote_id: int, fecha: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Return the frame in effect at a timestamp (latest at or before it)"""
+        stream = self._streams.get(lote_id)
+        if stream is None:
+            return None
+        if fecha is None:
+            i = len(stream.index) - 1
+        else:
+            i = bisect.bisect_right(stream.index, (to_utc_naive(fecha), len(stream.frames))) - 1
+        if i < 0:
+            return None
+        position = stream.index[i][1]
+        return _to_response(stream.frames[position], lote_id, stream.decode(position))
+
+    def iter_frames(
+        self, lote_id: int, desde: Optional[datetime] = None, hasta: Optional[datetime] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield reconstructed frames in time order for playback"""
+        stream = self._streams.get(lote_id)
+        if stream is None:
+            return
+        # Frames can be dropped by a retention run while playback is under way
+        stream = stream.snapshot()
+
+        lo = 0 if desde is None else bisect.bisect_left(stream.index, (to_utc_naive(desde), -1))
+        hi = len(stream.index) if hasta is None else bisect.bisect_right(
+            stream.index, (to_utc_naive(hasta), len(stream.frames))
+        )
+
+        previous = None
+        for _, position in stream.index[lo:hi]:
+            grid = stream.decode(position, previous)
+            previous = (position, grid)
+            yield _to_response(stream.frames[position], lote_id, grid)
+
+    def lote_ids(self) -> List[int]:
+        return list(self._streams)
+
+    def drop_before(self, lote_id: int, fecha: datetime) -> int:
+        """
+        Drop frames older than a timestamp, returning how many were dropped.
+        Only whole keyframe groups are dropped, so a group that still holds a
+        newer frame is kept until every frame in it has expired.
+        """
+        stream = self._streams.get(lote_id)
+        if stream is None:
+            return 0
+        fecha = to_utc_naive(fecha)
+
+        # Latest keyframe such that every frame before it is older than fecha
+        cut = 0
+        newest = None
+        k = 0
+        for position, frame in enumerate(stream.frames):
+            if k < len(stream.keyframes) and stream.keyframes[k] == position:
+                if newest is None or newest < fecha:
+                    cut = position
+                else:
+                    break
+                k += 1
+            if newest is None or frame.fecha > newest:
+                newest = frame.fecha
+        else:
+            if newest is not None and newest < fecha:
+                cut = len(stream.frames)
+
+        if cut == 0:
+            return 0
+        if cut == len(stream.frames):
+            del self._streams[lote_id]
+            return cut
+
+        stream.truncate(cut)
+        return cut
+
+
+# Create a singleton instance
+thermal_store = ThermalMapStore()
+
+
+# Convenience functions for easy imports
+def get_mapa_termico(lote_id: int, fecha: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    return thermal_store.get_frame(lote_id, fecha)
+
+
+def iter_mapas_termicos(
+    lote_id: int, desde: Optional[datetime] = None, hasta: Optional[datetime] = None
+) -> Iterator[Dict[str, Any]]:
+    return thermal_store.iter_frames(lote_id, desde, hasta)
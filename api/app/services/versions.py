@@ -0,0 +1,87 @@
+"""
+Change counters for conditional reads
+This module keeps a monotonically increasing version per lote and table so read
+endpoints can build ETags without touching the data tables
+"""
+
+import hashlib
+import logging
+import os
+from typing import Dict, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Tables each cached read depends on
+KPI_TABLES = ("lote", "consumo", "alimentacion", "mortalidad", "crecimiento")
+KPI_TABLE_SCOPES = ("nave",)  # densidad_aves_m2 uses the area of the lote's nave
+OVERVIEW_TABLES = KPI_TABLES + ("medicion_ambiental", "alerta")
+NAVE_MAP_TABLES = ("lote", "medicion_ambiental")
+
+
+class VersionTracker:
+    """
+    Per (lote, table) counters bumped by every write that can change what a
+    read returns, plus one counter per table for writes that are not tied to
+    a lote (granjas, naves) or reads that span all lotes. A random epoch is
+    part of every ETag, so counters restarting at zero after a restart never
+    match an ETag handed out by a previous process.
+    """
+
+    def __init__(self):
+        self._versions: Dict[Tuple[int, str], int] = {}
+        self._table_versions: Dict[str, int] = {}
+        self._epoch = os.urandom(4).hex()
+
+    def bump(self, lote_id: int, table: str) -> None:
+        key = (lote_id, table)
+        self._versions[key] = self._versions.get(key, 0) + 1
+        self.bump_table(table)
+
+    def bump_many(self, lote_ids: Iterable[int], table: str) -> None:
+        """Bump once per distinct lote, e.g. after a batch insert"""
+        for lote_id in set(lote_ids):
+            self.bump(lote_id, table)
+
+    def bump_table(self, table: str) -> None:
+        self._table_versions[table] = self._table_versions.get(table, 0) + 1
+
+    def version(self, lote_id: int, table: str) -> int:
+        return self._versions.get((lote_id, table), 0)
+
+    def table_version(self, table: str) -> int:
+        return self._table_versions.get(table, 0)
+
+    def etag(
+        self,
+        lote_ids: Iterable[int],
+        tables: Iterable[str],
+        table_scopes: Iterable[str] = (),
+    ) -> str:
+        """
+        Weak ETag over the versions of `tables` for `lote_ids` and the whole-table
+        versions of `table_scopes`. Weak, because compressed and identity
+        encodings of the same data share it.
+        """
+        tables = tuple(tables)
+        parts = [
+            f"{lote_id}:{table}:{self._versions.get((lote_id, table), 0)}"
+            for lote_id in sorted(set(lote_ids))
+            for table in tables
+        ]
+        parts.extend(f"*:{table}:{self._table_versions.get(table, 0)}" for table in table_scopes)
+        digest = hashlib.blake2b("|".join(parts).encode(), digest_size=8).hexdigest()
+        return f'W/"{self._epoch}-{digest}"'
+
+
+# Create a singleton instance
+version_tracker = VersionTracker()
+
+
+# Convenience functions for easy imports
+def get_lote_etag(lote_id: int, tables: Iterable[str], table_scopes: Iterable[str] = ()) -> str:
+    return version_tracker.etag([lote_id], tables, table_scopes)
+
+
+def get_table_etag(table: str) -> str:
+    return version_tracker.etag([], (), (table,))
@@ -0,0 +1,201 @@
+"""
+Bulk loader for historical backfill of consumo, alimentacion, mortalidad and crecimiento
+
+Streams a CSV (with header) or NDJSON file, validates it in chunks with the
+*Create schemas in a process pool and writes each chunk through
+DatabaseService.bulk_create. Progress is checkpointed after every chunk, so
+an interrupted load resumes where it stopped when run again.
+
+Usage:
+    python backfill.py consumo history/consumo.csv
+    python backfill.py mortalidad history/mortalidad.ndjson --workers 8 --chunk-size 20000
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Tuple
+
+from pydantic import ValidationError
+
+from app.services.database import BULK_SCHEMAS, db_service
+
+logger = logging.getLogger("backfill")
+
+
+def _read_chunks(path: str, fmt: str, chunk_size: int, skip: int) -> Iterator[Tuple[int, List[Any]]]:
+    """
+    Yield (first_row_number, raw_rows) chunks, skipping rows already loaded.
+    CSV rows are dicts of strings; NDJSON rows are unparsed lines.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            rows: Iterator[Any] = csv.DictReader(f)
+        else:
+            rows = (line for line in f if line.strip())
+
+        for _ in islice(rows, skip):
+            pass
+
+        start = skip
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield start, chunk
+            start += len(chunk)
+
+
+def _validate_chunk(
+    table: str, fmt: str, start: int, raw_rows: List[Any]
+) -> Tuple[List[Dict[str, Any]], List[int], List[Dict[str, Any]]]:
+    """
+    Parse and validate a chunk in a worker process, returning the valid rows,
+    their row numbers in the file and the rejects
+    """
+    schema = BULK_SCHEMAS[table]
+    rows = []
+    filas = []
+    errors = []
+    for offset, raw in enumerate(raw_rows):
+        try:
+            if fmt == "csv":
+                data = {k: (v if v != "" else None) for k, v in raw.items()}
+            else:
+                data = json.loads(raw)
+            rows.append(schema(**data).dict())
+            filas.append(start + offset + 1)
+        except (ValidationError, ValueError, TypeError) as e:
+            errors.append({
+                "fila": start + offset + 1,
+                "error": str(e).replace("\n", " "),
+                "datos": raw if fmt == "csv" else raw.rstrip("\n"),
+            })
+    return rows, filas, errors
+
+
+def _load_checkpoint(path: str, source: str, table: str) -> Dict[str, Any]:
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("archivo") == os.path.abspath(source) and checkpoint.get("tabla") == table:
+            return checkpoint
+        logger.warning(f"Ignoring checkpoint {path}: it belongs to another file or table")
+    return {
+        "archivo": os.path.abspath(source),
+        "tabla": table,
+        "filas": 0,
+        "creados": 0,
+        "rechazados": 0,
+    }
+
+
+def _save_checkpoint(path: str, checkpoint: Dict[str, Any]) -> None:
+    # Write then rename so a crash never leaves a half-written checkpoint
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+async def backfill(
+    table: str, path: str, fmt: str, chunk_size: int, workers: int, checkpoint_path: str
+) -> Dict[str, Any]:
+    checkpoint = _load_checkpoint(checkpoint_path, path, table)
+    if checkpoint["filas"]:
+        logger.info(f"Resuming {path} after row {checkpoint['filas']}")
+
+    await db_service.load_reference_cache()
+    rejects_path = f"{path}.rechazados.ndjson"
+    started = time.monotonic()
+    loaded = 0
+    loop = asyncio.get_running_loop()
+
+    # A fresh load starts a new rejects file; a resumed one appends to it
+    rejects_mode = "a" if checkpoint["filas"] else "w"
+    with ProcessPoolExecutor(max_workers=workers) as pool, \
+            open(rejects_path, rejects_mode, encoding="utf-8") as rejects:
+        chunks = _read_chunks(path, fmt, chunk_size, checkpoint["filas"])
+        pending = []
+
+        def submit_next() -> bool:
+            chunk = next(chunks, None)
+            if chunk is None:
+                return False
+            start, raw_rows = chunk
+            future = loop.run_in_executor(pool, _validate_chunk, table, fmt, start, raw_rows)
+            pending.append((len(raw_rows), future))
+            return True
+
+        # Keep a bounded number of chunks in flight so memory stays flat
+        while len(pending) < workers * 2 and submit_next():
+            pass
+
+        while pending:
+            size, future = pending.pop(0)
+            rows, filas, errors = await future
+            submit_next()
+
+            result = await db_service.bulk_create(table, rows)
+            for rechazado in result["rechazados"]:
+                indice = rechazado["indice"]
+                errors.append({
+                    "fila": filas[indice],
+                    "error": rechazado["error"],
+                    "datos": rows[indice],
+                })
+            for error in sorted(errors, key=lambda e: e["fila"]):
+                rejects.write(json.dumps(error, default=str, ensure_ascii=False) + "\n")
+
+            checkpoint["filas"] += size
+            checkpoint["creados"] += result["creados"]
+            checkpoint["rechazados"] += len(errors)
+            _save_checkpoint(checkpoint_path, checkpoint)
+
+            loaded += size
+            elapsed = time.monotonic() - started
+            logger.info(
+                f"{checkpoint['filas']} rows processed, {checkpoint['creados']} created, "
+                f"{checkpoint['rechazados']} rejected ({loaded / elapsed:,.0f} rows/s)"
+            )
+
+    return checkpoint
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backfill historical data into the storage layer")
+    parser.add_argument("table", choices=sorted(BULK_SCHEMAS), help="Target table")
+    parser.add_argument("path", help="CSV (with header) or NDJSON file")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Input format (default: from extension)")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Rows per validated chunk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parser processes")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <path>.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    # Per-row service logging would dominate a backfill
+    logging.getLogger("app").setLevel(logging.ERROR)
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    checkpoint_path = args.checkpoint or f"{args.path}.checkpoint"
+    if args.restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    checkpoint = asyncio.run(backfill(
+        args.table, args.path, fmt, args.chunk_size, args.workers, checkpoint_path
+    ))
+    logger.info(
+        f"Done: {checkpoint['filas']} rows, {checkpoint['creados']} created, "
+        f"{checkpoint['rechazados']} rejected"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,570 @@
+"""
+Deterministic synthetic farm data generator for load and scale testing
+
+Generates coherent multi-farm datasets: usuarios, granjas, naves and lotes,
+per-sensor medicion_ambiental at a fixed interval, thermal frames, daily
+consumo/alimentacion/mortalidad and crecimiento following a Gompertz curve.
+Every series is drawn from its own seeded generator, so the same seed always
+yields the same data regardless of which tables are produced. Series are
+built with numpy a whole sensor or lote at a time.
+
+The output can be loaded with backfill.py (consumo, alimentacion, mortalidad,
+crecimiento) or replayed against a running API at a target rate.
+
+Usage:
+    python datagen.py generate --out data/ --granjas 20 --naves 4 --sensores 8 --dias 42
+    python datagen.py generate --out data/ --granjas 200 --dry-run
+    python datagen.py replay --data data/ --url http://localhost:8000/api/v1 --rate 2000
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("datagen")
+
+_ENTITY_TABLES = ("usuario", "granja", "nave", "lote")
+_DAILY_TABLES = ("crecimiento", "mortalidad", "consumo", "alimentacion")
+_ENDPOINTS = {
+    "usuario": "/usuarios/",
+    "granja": "/granjas/",
+    "nave": "/naves/",
+    "lote": "/lotes/",
+    "crecimiento": "/crecimiento/",
+    "mortalidad": "/mortalidad/",
+    "consumo": "/consumo/",
+    "alimentacion": "/alimentacion/",
+    "medicion_ambiental": "/medicion-ambiental/batch",
+    "mapa_termico": "/mapa-termico/",
+}
+_ID_FIELDS = {table: f"{table}_id" for table in _ENTITY_TABLES}
+# Fields that point to an entity, and the entity table they point to
+_FOREIGN_KEYS = {
+    "granja": {"usuario_id": "usuario"},
+    "nave": {},
+    "lote": {"granja_id": "granja", "nave_id": "nave"},
+}
+_RETRY_STATUSES = {429, 503}
+
+_NAVE_WIDTH = 15.0  # meters; length follows from the area
+_RAZAS = ("Ross 308", "Cobb 500", "Hubbard")
+_RESPONSABLES = ("Ana", "Luis", "Marta", "Jorge", "Lucia")
+
+# Independent random streams, so each series is reproducible on its own
+_STREAM_ENTITIES, _STREAM_DAILY, _STREAM_SENSOR, _STREAM_THERMAL = range(4)
+
+
+@dataclass
+class FarmConfig:
+    seed: int = 42
+    granjas: int = 3
+    granjas_por_usuario: int = 3
+    naves_por_granja: int = 4
+    sensores_por_nave: int = 6
+    dias: int = 42
+    fecha_inicio: date = date(2024, 1, 1)
+    intervalo_medicion: int = 60  # seconds between readings of a sensor
+    intervalo_termico: int = 300  # seconds between thermal frames, 0 disables them
+    grid: Tuple[int, int] = (24, 32)
+    prob_anomalia: float = 1e-5  # chance per reading that a heat spike starts
+
+
+def _gompertz(t: np.ndarray, w_max: float, k: float, t_i: float) -> np.ndarray:
+    """Gompertz growth curve, in grams at age t days"""
+    return w_max * np.exp(-np.exp(-k * (t - t_i)))
+
+
+def _tipo_alimento(edad: np.ndarray) -> np.ndarray:
+    return np.select(
+        [edad < 10, edad < 21, edad < 35],
+        ["Pre-iniciador", "Iniciador", "Crecimiento"],
+        "Finalizador",
+    )
+
+
+def _target_temperature(edad: np.ndarray) -> np.ndarray:
+    """Barn set point: ~33 °C at placement easing towards ~21 °C"""
+    return 21.0 + 12.0 * np.exp(-edad / 14.0)
+
+
+class SyntheticFarmGenerator:
+    """Builds the entity tree up front and generates each time series on demand"""
+
+    def __init__(self, config: FarmConfig):
+        self.config = config
+        self.usuarios: List[Dict[str, Any]] = []
+        self.granjas: List[Dict[str, Any]] = []
+        self.naves: List[Dict[str, Any]] = []
+        self.lotes: List[Dict[str, Any]] = []
+        self.sensores: Dict[int, List[Tuple[float, float]]] = {}
+        self._build_entities()
+
+    def _rng(self, stream: int, *keys: int) -> np.random.Generator:
+        return np.random.default_rng([self.config.seed, stream, *keys])
+
+    def _build_entities(self) -> None:
+        cfg = self.config
+        rng = self._rng(_STREAM_ENTITIES)
+        n_usuarios = math.ceil(cfg.granjas / cfg.granjas_por_usuario)
+        for usuario_id in range(1, n_usuarios + 1):
+            self.usuarios.append({
+                "usuario_id": usuario_id,
+                "nombre": f"Productor {usuario_id}",
+                "email": f"productor{usuario_id}@example.com",
+                "contraseña": f"synthetic-{usuario_id:06d}",
+            })
+
+        nave_id = lote_id = 0
+        for granja_id in range(1, cfg.granjas + 1):
+            areas = rng.uniform(900, 2000, cfg.naves_por_granja).round(0)
+            self.granjas.append({
+                "granja_id": granja_id,
+                "nombre": f"Granja {granja_id}",
+                "capacidad": int(areas.sum() * 18),
+                "ubicacion": f"Zona {granja_id % 7 + 1}",
+                "usuario_id": (granja_id - 1) // cfg.granjas_por_usuario + 1,
+            })
+            for area in areas:
+                nave_id += 1
+                lote_id += 1
+                self.naves.append({
+                    "nave_id": nave_id,
+                    "nombre": f"Nave {granja_id}-{nave_id}",
+                    "capacidad": int(area * 18),
+                    "ubicacion": f"Granja {granja_id}",
+                    "estado": "activa",
+                    "area": float(area),
+                })
+                self.lotes.append({
+                    "lote_id": lote_id,
+                    "codigo": f"L{granja_id:04d}-{nave_id:05d}",
+                    "fecha_ingreso": cfg.fecha_inicio + timedelta(days=int(rng.integers(0, 7))),
+                    "cantidad_inicial": int(area * rng.uniform(14, 18)),
+                    "raza": str(rng.choice(_RAZAS)),
+                    "granja_id": granja_id,
+                    "nave_id": nave_id,
+                    "estado": "activo",
+                })
+                # Sensors spread along the length of the barn, alternating sides
+                length = area / _NAVE_WIDTH
+                n = cfg.sensores_por_nave
+                xs = (np.arange(n) + 0.5) * length / n
+                ys = np.where(np.arange(n) % 2 == 0, _NAVE_WIDTH * 0.25, _NAVE_WIDTH * 0.75)
+                self.sensores[nave_id] = [(round(float(x), 1), float(y)) for x, y in zip(xs, ys)]
+
+    def estimate_rows(self) -> Dict[str, int]:
+        """Rows each table will have, without generating anything"""
+        cfg = self.config
+        lotes = len(self.lotes)
+        por_lote = cfg.dias * 86400
+        return {
+            "usuario": len(self.usuarios),
+            "granja": len(self.granjas),
+            "nave": len(self.naves),
+            "lote": lotes,
+            "medicion_ambiental": lotes * cfg.sensores_por_nave * (por_lote // cfg.intervalo_medicion),
+            "mapa_termico": lotes * (por_lote // cfg.intervalo_termico) if cfg.intervalo_termico else 0,
+            "crecimiento": lotes * cfg.dias,
+            "consumo": lotes * cfg.dias,
+            "alimentacion": lotes * cfg.dias,
+            "mortalidad": lotes * cfg.dias,  # upper bound, days without deaths are skipped
+        }
+
+    def daily(self, lote: Dict[str, Any]) -> Dict[str, Dict[str, np.ndarray]]:
+        """Daily crecimiento, mortalidad, consumo and alimentacion of a lote"""
+        cfg = self.config
+        rng = self._rng(_STREAM_DAILY, lote["lote_id"])
+        edad = np.arange(1, cfg.dias + 1, dtype=float)
+        fechas = np.datetime64(lote["fecha_ingreso"]) + np.arange(1, cfg.dias + 1)
+
+        # Per-lote Gompertz parameters around typical broiler values
+        w_max = rng.normal(6800, 300)
+        k = rng.normal(0.04, 0.002)
+        t_i = rng.normal(40, 1.5)
+        peso = _gompertz(edad, w_max, k, t_i)
+        peso_medido = peso * (1 + rng.normal(0, 0.01, cfg.dias))
+        ganancia = np.diff(_gompertz(np.arange(0, cfg.dias + 1, dtype=float), w_max, k, t_i))
+
+        # Higher mortality during the first week
+        tasa = np.where(edad <= 7, 0.002, 0.0004)
+        muertes = rng.binomial(lote["cantidad_inicial"], tasa)
+        vivas = lote["cantidad_inicial"] - np.concatenate([[0], np.cumsum(muertes)[:-1]])
+
+        # Intake follows gain with a conversion that worsens with age
+        fcr_diario = 1.1 + 0.02 * edad
+        alimento = vivas * ganancia * fcr_diario / 1000 * (1 + rng.normal(0, 0.03, cfg.dias))
+        agua = alimento * rng.normal(1.8, 0.08, cfg.dias)
+        desperdicio = alimento * rng.uniform(0.02, 0.04, cfg.dias)
+        tipo = _tipo_alimento(edad)
+        nave = self.naves[lote["nave_id"] - 1]
+
+        lote_ids = np.full(cfg.dias, lote["lote_id"])
+        con_muertes = muertes > 0
+        return {
+            "crecimiento": {
+                "lote_id": lote_ids,
+                "fecha": fechas.astype(str),
+                "peso_promedio": peso_medido.round(1),
+                "ganancia_diaria": ganancia.round(1),
+                "uniformidad": rng.uniform(80, 92, cfg.dias).round(1),
+            },
+            "mortalidad": {
+                "lote_id": lote_ids[con_muertes],
+                "fecha": fechas[con_muertes].astype(str),
+                "cantidad": muertes[con_muertes],
+                "causa": rng.choice(["Natural", "Metabólica", "Respiratoria"], con_muertes.sum()),
+            },
+            "consumo": {
+                "lote_id": lote_ids,
+                "fecha_hora": (fechas.astype("datetime64[s]") + np.timedelta64(23 * 3600, "s")).astype(str),
+                "cantidad_agua": agua.round(1),
+                "cantidad_alimento": alimento.round(2),
+                "tipo_alimento": tipo,
+                "desperdicio": desperdicio.round(2),
+                "kwh": (nave["area"] * rng.normal(0.05, 0.005, cfg.dias)).round(1),
+            },
+            "alimentacion": {
+                "lote_id": lote_ids,
+                "fecha": (fechas.astype("datetime64[s]") + np.timedelta64(7 * 3600, "s")).astype(str),
+                "tipo_alimento": tipo,
+                "cantidad_suministrada": (alimento + desperdicio).round(2),
+                "hora_suministro": np.full(cfg.dias, "07:00"),
+                "responsable": rng.choice(_RESPONSABLES, cfg.dias),
+            },
+        }
+
+    def mediciones(self, lote: Dict[str, Any]) -> Iterator[Dict[str, np.ndarray]]:
+        """Environmental readings of a lote, one sensor series at a time"""
+        cfg = self.config
+        n = cfg.dias * 86400 // cfg.intervalo_medicion
+        segundos = np.arange(n, dtype=np.int64) * cfg.intervalo_medicion
+        edad = segundos / 86400
+        hora = (segundos % 86400) / 3600
+        diurno = np.sin(2 * np.pi * (hora - 9) / 24)
+        inicio = np.datetime64(datetime.combine(lote["fecha_ingreso"], datetime.min.time()), "s")
+        fechas = (inicio + segundos.astype("timedelta64[s]")).astype(str)
+        luz = np.where((hora >= 4) | (edad < 7), 30.0, 5.0)
+
+        for sensor, (x, y) in enumerate(self.sensores[lote["nave_id"]]):
+            rng = self._rng(_STREAM_SENSOR, lote["lote_id"], sensor)
+            # Slow drift from hourly knots plus fast measurement noise
+            horas = np.arange(0, n * cfg.intervalo_medicion + 3600, 3600)
+            deriva = np.interp(segundos, horas, rng.normal(0, 0.6, len(horas)))
+
+            temperatura = (
+                _target_temperature(edad) + 1.5 * diurno + rng.normal(0, 0.8)
+                + deriva + rng.normal(0, 0.15, n)
+            )
+            # Rare heat spikes lasting ~10 readings, to exercise the alerting path
+            picos = np.flatnonzero(rng.random(n) < cfg.prob_anomalia)
+            for inicio_pico in picos:
+                temperatura[inicio_pico:inicio_pico + 10] += rng.uniform(6, 10)
+
+            yield {
+                "lote_id": np.full(n, lote["lote_id"]),
+                "fecha_hora": fechas,
+                "temperatura": temperatura.round(2),
+                "humedad": np.clip(62 - 6 * diurno + 2 * deriva + rng.normal(0, 1, n), 0, 100).round(1),
+                "ubicacion": np.full(n, f"{x},{y}"),
+                "co2": np.clip(700 + 50 * edad - 150 * diurno + rng.normal(0, 40, n), 0, None).round(0),
+                "amoniaco": np.clip(2 + 0.4 * edad + rng.normal(0, 0.8, n), 0, None).round(2),
+                "iluminacion": (luz + rng.normal(0, 1, n)).clip(0).round(1),
+            }
+
+    def mapas_termicos(self, lote: Dict[str, Any], chunk: int = 500) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Thermal frames of a lote as (timestamps, grids) chunks"""
+        cfg = self.config
+        if not cfg.intervalo_termico:
+            return
+        rng = self._rng(_STREAM_THERMAL, lote["lote_id"])
+        rows, cols = cfg.grid
+        n = cfg.dias * 86400 // cfg.intervalo_termico
+        inicio = np.datetime64(datetime.combine(lote["fecha_ingreso"], datetime.min.time()), "s")
+
+        # Fixed spatial pattern per nave: cooler near the inlets, a few warm spots
+        gx = np.linspace(-1, 1, cols)[None, :]
+        gy = np.linspace(-1, 1, rows)[:, None]
+        patron = -0.8 * gx + 0.3 * np.abs(gy)
+        for _ in range(3):
+            cx, cy = rng.uniform(-1, 1, 2)
+            patron = patron + 1.2 * np.exp(-((gx - cx) ** 2 + (gy - cy) ** 2) / 0.05)
+
+        for start in range(0, n, chunk):
+            segundos = np.arange(start, min(start + chunk, n), dtype=np.int64) * cfg.intervalo_termico
+            edad = segundos / 86400
+            base = _target_temperature(edad) + 1.5 * np.sin(2 * np.pi * ((segundos % 86400) / 3600 - 9) / 24)
+            grids = base[:, None, None] + patron[None] + rng.normal(0, 0.2, (len(segundos), rows, cols))
+            yield (inicio + segundos.astype("timedelta64[s]")).astype(str), grids.round(1)
+
+
+def _write_columns(path: str, columns: Dict[str, np.ndarray], fmt: str, header: bool) -> int:
+    """Append columnar data to a CSV or NDJSON file, returning the rows written"""
+    names = list(columns)
+    values = [columns[name].tolist() for name in names]
+    rows = list(zip(*values))
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            if header:
+                writer.writerow(names)
+            writer.writerows(rows)
+        else:
+            f.writelines(json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n" for row in rows)
+    return len(rows)
+
+
+def generate(generator: SyntheticFarmGenerator, out: str, fmt: str) -> Dict[str, int]:
+    """Write every table of the dataset under `out`"""
+    os.makedirs(out, exist_ok=True)
+    ext = "csv" if fmt == "csv" else "ndjson"
+    counts: Dict[str, int] = {}
+    started = time.monotonic()
+
+    for table, rows in zip(_ENTITY_TABLES, (generator.usuarios, generator.granjas, generator.naves, generator.lotes)):
+        with open(os.path.join(out, f"{table}.ndjson"), "w", encoding="utf-8") as f:
+            f.writelines(json.dumps(row, default=str, ensure_ascii=False) + "\n" for row in rows)
+        counts[table] = len(rows)
+
+    for table in (*_DAILY_TABLES, "medicion_ambiental"):
+        path = os.path.join(out, f"{table}.{ext}")
+        if os.path.exists(path):
+            os.remove(path)
+        counts[table] = 0
+    thermal_path = os.path.join(out, "mapa_termico.ndjson")
+    if os.path.exists(thermal_path):
+        os.remove(thermal_path)
+    counts["mapa_termico"] = 0
+
+    for lote in generator.lotes:
+        for table, columns in generator.daily(lote).items():
+            path = os.path.join(out, f"{table}.{ext}")
+            counts[table] += _write_columns(path, columns, fmt, header=counts[table] == 0)
+
+        path = os.path.join(out, f"medicion_ambiental.{ext}")
+        for columns in generator.mediciones(lote):
+            counts["medicion_ambiental"] += _write_columns(
+                path, columns, fmt, header=counts["medicion_ambiental"] == 0
+            )
+
+        with open(thermal_path, "a", encoding="utf-8") as f:
+            for fechas, grids in generator.mapas_termicos(lote):
+                for fecha, grid in zip(fechas, grids.tolist()):
+                    f.write(json.dumps({"lote_id": lote["lote_id"], "fecha": fecha, "temperaturas": grid}) + "\n")
+                counts["mapa_termico"] += len(fechas)
+
+        total = sum(counts.values())
+        logger.info(
+            f"Lote {lote['lote_id']}/{len(generator.lotes)} done, {total:,} rows "
+            f"({total / (time.monotonic() - started):,.0f} rows/s)"
+        )
+
+    return counts
+
+
+def _read_rows(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                yield {k: v for k, v in row.items() if v != ""}
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _remap(table: str, row: Dict[str, Any], ids: Dict[str, Dict[int, int]]) -> bool:
+    """
+    Replace generated parent ids with the ids the API assigned. Returns False
+    when a parent replayed in this run was not created, so the row is skipped.
+    Parents of tables not replayed in this run are assumed to exist already.
+    """
+    for field, parent in _FOREIGN_KEYS.get(table, {"lote_id": "lote"}).items():
+        if row.get(field) is None or parent not in ids:
+            continue
+        assigned = ids[parent].get(int(row[field]))
+        if assigned is None:
+            return False
+        row[field] = assigned
+    return True
+
+
+async def replay(
+    data: str,
+    url: str,
+    rate: float,
+    batch_size: int,
+    concurrency: int,
+    tables: List[str],
+    max_retries: int,
+) -> None:
+    """
+    POST a generated dataset to the API, pacing requests to `rate` rows/s.
+    Entities are created first and the ids the API returns are used for the
+    rows that reference them. 429 and 503 responses are retried after their
+    Retry-After delay.
+    """
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    # Like a real device, each simulated device sends one request at a time
+    device_locks: Dict[str, asyncio.Lock] = {}
+    status_counts: Dict[int, int] = {}
+    ids: Dict[str, Dict[int, int]] = {}
+
+    async with httpx.AsyncClient(base_url=url.rstrip("/"), timeout=30) as client:
+        async def post(endpoint: str, payload: Any, device: str) -> Any:
+            """POST with retries; returns the response data of a success, else None"""
+            async with device_locks.setdefault(device, asyncio.Lock()):
+                for attempt in range(max_retries + 1):
+                    async with semaphore:
+                        try:
+                            response = await client.post(endpoint, json=payload, headers={"X-Device-Id": device})
+                        except httpx.HTTPError as e:
+                            logger.warning(f"POST {endpoint} failed: {e}")
+                            status_counts[0] = status_counts.get(0, 0) + 1
+                            return None
+                    if response.status_code not in _RETRY_STATUSES or attempt == max_retries:
+                        break
+                    # Wait outside the semaphore so other devices keep going
+                    await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+
+            status_counts[response.status_code] = status_counts.get(response.status_code, 0) + 1
+            if response.is_success:
+                return response.json().get("data")
+            return None
+
+        for table in tables:
+            paths = [os.path.join(data, f"{table}.{ext}") for ext in ("ndjson", "csv")]
+            path = next((p for p in paths if os.path.exists(p)), None)
+            if path is None:
+                logger.warning(f"No data file for {table}, skipping")
+                continue
+
+            endpoint = _ENDPOINTS[table]
+            id_field = _ID_FIELDS.get(table)
+            size = batch_size if endpoint.endswith("/batch") else 1
+            started = time.monotonic()
+            sent = skipped = 0
+            tasks = set()
+            batch: List[Dict[str, Any]] = []
+            device = ""
+            if id_field:
+                ids[table] = {}
+
+            async def send_entity(generated_id: int, payload: Dict[str, Any], device: str) -> None:
+                result = await post(endpoint, payload, device)
+                if result is not None:
+                    ids[table][generated_id] = result[id_field]
+
+            async def flush() -> None:
+                nonlocal sent, batch
+                # Pace by rows sent so far, whatever the batch size
+                delay = started + sent / rate - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if id_field:
+                    row = batch[0]
+                    coro = send_entity(int(row.pop(id_field)), row, device)
+                else:
+                    coro = post(endpoint, batch if size > 1 else batch[0], device)
+                task = asyncio.create_task(coro)
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                sent += len(batch)
+                batch = []
+
+            for row in _read_rows(path):
+                if not batch:
+                    # One device per generated lote, whatever id the API gave it
+                    device = f"datagen-{table}-{row.get('lote_id', 0)}"
+                if not _remap(table, row, ids):
+                    skipped += 1
+                    continue
+                batch.append(row)
+                if len(batch) >= size:
+                    await flush()
+            if batch:
+                await flush()
+            # Children are only sent once every parent id is known
+            await asyncio.gather(*tasks)
+
+            if id_field and len(set(ids[table].values())) < len(ids[table]):
+                logger.warning(
+                    f"The API assigned {len(set(ids[table].values()))} distinct ids to "
+                    f"{len(ids[table])} {table} rows; rows that reference them will collide"
+                )
+            elapsed = time.monotonic() - started
+            logger.info(
+                f"Replayed {sent:,} {table} rows in {elapsed:.1f}s ({sent / max(elapsed, 1e-9):,.0f} rows/s)"
+                + (f", skipped {skipped:,} whose parent was not created" if skipped else "")
+            )
+
+    logger.info(f"Responses by status: {status_counts}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Synthetic poultry farm data for load and scale testing")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    gen = sub.add_parser("generate", help="Write a dataset to files")
+    gen.add_argument("--out", required=True, help="Output directory")
+    gen.add_argument("--seed", type=int, default=42)
+    gen.add_argument("--granjas", type=int, default=3)
+    gen.add_argument("--granjas-por-usuario", type=int, default=3)
+    gen.add_argument("--naves", type=int, default=4, help="Naves per granja (one lote each)")
+    gen.add_argument("--sensores", type=int, default=6, help="Sensors per nave")
+    gen.add_argument("--dias", type=int, default=42, help="Days of grow-out per lote")
+    gen.add_argument("--fecha-inicio", type=date.fromisoformat, default=date(2024, 1, 1))
+    gen.add_argument("--intervalo-medicion", type=int, default=60, help="Seconds between sensor readings")
+    gen.add_argument("--intervalo-termico", type=int, default=300, help="Seconds between thermal frames (0 disables)")
+    gen.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    gen.add_argument("--dry-run", action="store_true", help="Only print the number of rows per table")
+
+    rep = sub.add_parser("replay", help="POST a generated dataset to a running API")
+    rep.add_argument("--data", required=True, help="Directory written by generate")
+    rep.add_argument("--url", default="http://localhost:8000/api/v1")
+    rep.add_argument("--rate", type=float, default=1000, help="Target rows per second")
+    rep.add_argument("--batch-size", type=int, default=100, help="Readings per medicion_ambiental batch")
+    rep.add_argument("--concurrency", type=int, default=32)
+    rep.add_argument("--max-retries", type=int, default=5, help="Retries of a 429/503 response")
+    rep.add_argument("--tables", nargs="+", default=[*_ENTITY_TABLES, *_DAILY_TABLES, "medicion_ambiental", "mapa_termico"])
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    if args.command == "generate":
+        generator = SyntheticFarmGenerator(FarmConfig(
+            seed=args.seed,
+            granjas=args.granjas,
+            granjas_por_usuario=args.granjas_por_usuario,
+            naves_por_granja=args.naves,
+            sensores_por_nave=args.sensores,
+            dias=args.dias,
+            fecha_inicio=args.fecha_inicio,
+            intervalo_medicion=args.intervalo_medicion,
+            intervalo_termico=args.intervalo_termico,
+        ))
+        estimate = generator.estimate_rows()
+        logger.info(f"Expected rows: {estimate} (total {sum(estimate.values()):,})")
+        if not args.dry_run:
+            counts = generate(generator, args.out, args.format)
+            logger.info(f"Wrote {sum(counts.values()):,} rows: {counts}")
+    else:
+        asyncio.run(replay(
+            args.data, args.url, args.rate, args.batch_size, args.concurrency, args.tables, args.max_retries
+        ))
+
+
+if __name__ == "__main__":
+    main()
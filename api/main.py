@@ -2,12 +2,19 @@
 FastAPI application for Poultry Management System API
 """
 
+import asyncio
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
 
 from app.core.config import settings
+from app.middleware.decompression import RequestDecompressionMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.services.database import db_service
+from app.services.storage import partitioned_storage
 
 # Create FastAPI instance
 app = FastAPI(
@@ -18,15 +25,54 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
-# Configure CORS
+# Middleware is listed innermost first: each add_middleware wraps the ones before it
+
+# Negotiated gzip responses
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE)
+
+# Per-device rate limits and load shedding on ingest routes. Bodies are only
+# decompressed when the route reads them, so rejected requests cost little
+app.add_middleware(
+    RateLimitMiddleware,
+    limits=settings.RATE_LIMITS,
+    max_clients=settings.RATE_LIMIT_MAX_CLIENTS,
+    write_high_water_mark=settings.WRITE_HIGH_WATER_MARK,
+)
+
+# Compressed request bodies (gzip/deflate/zstd)
+app.add_middleware(
+    RequestDecompressionMiddleware,
+    max_size=settings.MAX_DECOMPRESSED_BODY_BYTES,
+)
+
+# Configure CORS (outermost, so every response, including 429s, carries CORS headers)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ALLOWED_HOSTS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "ETag"],
 )
 
+# Startup and background tasks
+@app.on_event("startup")
+async def load_reference_cache():
+    """Load the lotes, granjas and usuarios the write path validates against"""
+    await db_service.load_reference_cache()
+
+
+@app.on_event("startup")
+async def start_retention():
+    """Start the periodic retention job for time-partitioned tables"""
+    app.state.retention_task = asyncio.create_task(partitioned_storage.run_retention())
+
+
+@app.on_event("shutdown")
+async def stop_retention():
+    """Stop the periodic retention job"""
+    app.state.retention_task.cancel()
+
 # Health check endpoint
 @app.get("/health")
 async def health_check():
@@ -51,13 +97,15 @@ async def root():
 
 # Include API routers
 from app.routers import (
-    usuarios, granjas, lotes, pollos, crecimiento,
-    consumo, alimentacion, medicion_ambiental, mortalidad, mapa_termico
+    usuarios, granjas, naves, lotes, pollos, crecimiento,
+    consumo, alimentacion, medicion_ambiental, mortalidad, mapa_termico,
+    alertas
 )
 
 # Add all routers with API version prefix
 app.include_router(usuarios.router, prefix="/api/v1")
 app.include_router(granjas.router, prefix="/api/v1")
+app.include_router(naves.router, prefix="/api/v1")
 app.include_router(lotes.router, prefix="/api/v1")
 app.include_router(pollos.router, prefix="/api/v1")
 app.include_router(crecimiento.router, prefix="/api/v1")
@@ -66,6 +114,7 @@ app.include_router(alimentacion.router, prefix="/api/v1")
 app.include_router(medicion_ambiental.router, prefix="/api/v1")
 app.include_router(mortalidad.router, prefix="/api/v1")
 app.include_router(mapa_termico.router, prefix="/api/v1")
+app.include_router(alertas.router, prefix="/api/v1")
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -0,0 +1,22 @@
+"""
+Tests for the conditional GET helpers
+"""
+
+import pytest
+
+from app.core.conditional import etag_matches
+
+ETAG = 'W/"epoch-abc"'
+
+
+@pytest.mark.parametrize("header, exists, expected", [
+    (None, True, False),
+    ('W/"epoch-abc"', False, True),
+    ('"epoch-abc"', False, True),
+    ('"other", W/"epoch-abc"', False, True),
+    ('W/"epoch-old"', True, False),
+    ("*", False, False),
+    ("*", True, True),
+])
+def test_etag_matches(header, exists, expected):
+    assert etag_matches(header, ETAG, exists) is expected
@@ -0,0 +1,93 @@
+"""
+Tests for the request body decompression middleware
+"""
+
+import gzip
+import zlib
+
+import pytest
+import zstandard
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.middleware.decompression import RequestDecompressionMiddleware
+
+MAX_SIZE = 64 * 1024
+BODY = b'{"lote_id": 1, "temperatura": 25.0}' * 100
+
+
+async def echo(request: Request) -> PlainTextResponse:
+    body = await request.body()
+    return PlainTextResponse(body, headers={"X-Encoding": request.headers.get("content-encoding", "")})
+
+
+@pytest.fixture
+def client():
+    app = Starlette(routes=[Route("/", echo, methods=["POST"])])
+    return TestClient(RequestDecompressionMiddleware(app, max_size=MAX_SIZE))
+
+
+def deflate(data):
+    return zlib.compress(data)
+
+
+def zstd(data):
+    return zstandard.ZstdCompressor().compress(data)
+
+
+COMPRESSORS = {"gzip": gzip.compress, "deflate": deflate, "zstd": zstd}
+
+
+def post(client, data, encoding):
+    return client.post("/", content=data, headers={"Content-Encoding": encoding})
+
+
+@pytest.mark.parametrize("encoding", COMPRESSORS)
+def test_body_round_trips(client, encoding):
+    response = post(client, COMPRESSORS[encoding](BODY), encoding)
+
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.headers["X-Encoding"] == ""
+
+
+def test_identity_body_is_passed_through(client):
+    assert post(client, BODY, "identity").content == BODY
+
+
+@pytest.mark.parametrize("encoding", COMPRESSORS)
+def test_body_at_the_limit_is_accepted(client, encoding):
+    response = post(client, COMPRESSORS[encoding](b"0" * MAX_SIZE), encoding)
+
+    assert response.status_code == 200
+    assert len(response.content) == MAX_SIZE
+
+
+@pytest.mark.parametrize("encoding", COMPRESSORS)
+def test_zip_bomb_is_rejected(client, encoding):
+    bomb = COMPRESSORS[encoding](b"0" * (16 * 1024 * 1024))
+    assert len(bomb) < MAX_SIZE
+
+    assert post(client, bomb, encoding).status_code == 413
+
+
+@pytest.mark.parametrize("encoding", COMPRESSORS)
+def test_truncated_body_is_rejected(client, encoding):
+    data = COMPRESSORS[encoding](BODY)
+
+    assert post(client, data[: len(data) // 2], encoding).status_code == 400
+
+
+@pytest.mark.parametrize("encoding", COMPRESSORS)
+def test_corrupt_body_is_rejected(client, encoding):
+    assert post(client, b"not compressed at all" * 10, encoding).status_code == 400
+
+
+def test_unknown_encoding_is_rejected(client):
+    response = post(client, BODY, "br")
+
+    assert response.status_code == 415
+    assert "br" in response.text
@@ -0,0 +1,149 @@
+"""
+Tests for the per-device rate limiting and admission control middleware
+"""
+
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.middleware import rate_limit
+from app.middleware.rate_limit import RateLimitMiddleware, charge_records, retry_after
+
+RATE = 2.0
+BURST = 5
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+async def ingest(request: Request) -> JSONResponse:
+    records = int(request.query_params.get("records", 1))
+    wait = charge_records(request, records)
+    if wait:
+        return JSONResponse({"detail": "limited"}, status_code=429, headers={"Retry-After": retry_after(wait)})
+    return JSONResponse({"records": records}, status_code=201)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+
+def make_client(max_clients=100, write_high_water_mark=100):
+    app = Starlette(routes=[
+        Route("/ingest", ingest, methods=["GET", "POST"]),
+        Route("/other", ingest, methods=["POST"]),
+    ])
+    middleware = RateLimitMiddleware(
+        app,
+        limits={"/ingest": (RATE, BURST)},
+        max_clients=max_clients,
+        write_high_water_mark=write_high_water_mark,
+    )
+    return middleware, TestClient(middleware)
+
+
+def post(client, device="d1", records=1, path="/ingest"):
+    return client.post(path, params={"records": records}, headers={"X-Device-Id": device})
+
+
+def test_burst_then_limited_with_retry_after(clock):
+    _, client = make_client()
+
+    assert [post(client).status_code for _ in range(BURST)] == [201] * BURST
+    response = post(client)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+    clock.now += 0.4
+    assert post(client).status_code == 429
+    clock.now += 0.1
+    assert post(client).status_code == 201
+
+
+def test_tokens_refill_up_to_the_burst(clock):
+    _, client = make_client()
+    for _ in range(BURST):
+        post(client)
+
+    clock.now += 3600
+    assert [post(client).status_code for _ in range(BURST + 1)] == [201] * BURST + [429]
+
+
+def test_devices_and_unlimited_routes_are_independent(clock):
+    _, client = make_client()
+    for _ in range(BURST):
+        post(client, "d1")
+
+    assert post(client, "d1").status_code == 429
+    assert post(client, "d2").status_code == 201
+    assert post(client, "d1", path="/other").status_code == 201
+    assert client.get("/ingest", headers={"X-Device-Id": "d1"}).status_code == 201
+
+
+def test_batch_above_the_burst_passes_from_a_full_bucket_and_is_paid_back(clock):
+    _, client = make_client()
+
+    assert post(client, records=BURST * 3).status_code == 201
+    response = post(client)
+    assert response.status_code == 429
+    # 10 tokens in debt plus the one needed: 11 / 2 per second
+    assert response.headers["Retry-After"] == "6"
+
+    clock.now += 5.5
+    assert post(client).status_code == 201
+
+
+def test_batch_over_the_available_tokens_is_rejected_after_parsing(clock):
+    _, client = make_client()
+    post(client, records=3)
+
+    response = post(client, records=4)
+    assert response.status_code == 429
+    # 2 tokens left, 4 needed, plus the admission the rejected batch paid
+    assert response.headers["Retry-After"] == "2"
+
+    clock.now += 1.0
+    assert post(client, records=3).status_code == 201
+
+
+def test_least_recently_seen_device_is_evicted(clock):
+    middleware, client = make_client(max_clients=2)
+    for _ in range(BURST):
+        post(client, "d1")
+    post(client, "d2")
+    post(client, "d3")
+
+    assert ("/ingest", "d1") not in middleware._buckets
+    assert list(middleware._buckets) == [("/ingest", "d2"), ("/ingest", "d3")]
+    # An evicted device starts again from a full bucket
+    assert post(client, "d1").status_code == 201
+    assert ("/ingest", "d2") not in middleware._buckets
+
+
+def test_writes_are_shed_at_the_high_water_mark(clock):
+    middleware, client = make_client(write_high_water_mark=3)
+    middleware.writes_in_flight = 3
+
+    response = post(client)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+
+    middleware.writes_in_flight = 2
+    assert post(client).status_code == 201
+    assert middleware.writes_in_flight == 2
+
+
+@pytest.mark.parametrize("seconds, header", [(0.01, "1"), (1.0, "1"), (1.2, "2"), (5.5, "6")])
+def test_retry_after_rounds_up_to_whole_seconds(seconds, header):
+    assert retry_after(seconds) == header
@@ -0,0 +1,34 @@
+"""
+Tests for the foreign-key resolution cache
+"""
+
+from app.models.schemas import EstadoLote
+from app.services.references import (
+    ReferenceCache, UnknownReferenceError, InactiveReferenceError
+)
+
+
+def lote(lote_id, estado="activo"):
+    return {"lote_id": lote_id, "granja_id": 1, "estado": estado, "cantidad_inicial": 100}
+
+
+def test_estado_of_an_uncached_lote_is_enforced():
+    cache = ReferenceCache()
+    assert isinstance(cache.lote_error(5), UnknownReferenceError)
+
+    cache.set_lote_estado(5, EstadoLote.VENDIDO)
+    assert isinstance(cache.lote_error(5), InactiveReferenceError)
+
+    cache.set_lote_estado(5, EstadoLote.ACTIVO)
+    assert isinstance(cache.lote_error(5), UnknownReferenceError)
+
+
+def test_a_loaded_lote_replaces_the_recorded_estado():
+    cache = ReferenceCache()
+    cache.set_lote_estado(5, EstadoLote.INACTIVO)
+    cache.put_lote(lote(5))
+
+    assert cache.lote_error(5) is None
+    cache.set_lote_estado(5, EstadoLote.VENDIDO)
+    assert set(cache.check_lotes([5, 6])) == {5, 6}
+    assert isinstance(cache.check_lotes([5])[5], InactiveReferenceError)
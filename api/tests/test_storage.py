@@ -0,0 +1,106 @@
+"""
+Tests for the time-partitioned storage and its retention job
+"""
+
+import asyncio
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.services import storage as storage_module
+from app.services.storage import TimePartitionedStorage
+from app.services.thermal_storage import thermal_store
+
+NOW = datetime(2022, 1, 1)
+
+
+@pytest.fixture
+def storage(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(storage_module, "pq", None)
+    return TimePartitionedStorage()
+
+
+def consumo(fecha, cantidad_agua, lote_id=1):
+    return {
+        "lote_id": lote_id,
+        "fecha_hora": fecha,
+        "cantidad_agua": cantidad_agua,
+        "cantidad_alimento": 1.0,
+        "tipo_alimento": "Iniciador",
+    }
+
+
+def expire(storage):
+    return asyncio.run(storage.enforce_retention(NOW))
+
+
+def test_expired_month_is_rolled_up_per_day(storage):
+    storage.insert("consumo", consumo(datetime(2020, 1, 5, 8), 2.0))
+    storage.insert("consumo", consumo(datetime(2020, 1, 5, 20), 4.0))
+    storage.insert("consumo", consumo(datetime(2020, 1, 6, 8), 1.0))
+
+    assert [e["filas"] for e in expire(storage)] == [3]
+    assert storage.partitions("consumo") == {}
+    rollups = storage.get_rollups("consumo", 1)
+    assert [r["fecha"].day for r in rollups] == [5, 6]
+    assert rollups[0]["cantidad_agua"] == {"media": 3.0, "min": 2.0, "max": 4.0, "suma": 6.0, "n": 2}
+
+
+def test_late_rows_are_added_to_the_existing_rollup(storage):
+    storage.insert("consumo", consumo(datetime(2020, 1, 5, 8), 2.0))
+    storage.insert("consumo", consumo(datetime(2020, 1, 5, 20), 4.0))
+    expire(storage)
+
+    storage.insert("consumo", consumo(datetime(2020, 1, 5, 12), 1.0))
+    expire(storage)
+
+    (rollup,) = storage.get_rollups("consumo", 1)
+    assert rollup["cantidad_agua"] == {"media": 2.333, "min": 1.0, "max": 4.0, "suma": 7.0, "n": 3}
+    assert rollup["cantidad_alimento"]["n"] == 3
+    assert storage.get_rollups("consumo", 2) == []
+
+
+
+def test_failed_archive_keeps_the_partition(storage, monkeypatch):
+    archive = storage._archive
+    storage.insert("consumo", consumo(datetime(2020, 1, 5, 8), 2.0))
+
+    def fail(*args):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(storage, "_archive", fail)
+    assert expire(storage) == []
+    storage.insert("consumo", consumo(datetime(2020, 1, 5, 9), 4.0))
+    assert storage.partitions("consumo") == {(2020, 1): 2}
+    assert storage.get_rollups("consumo", 1) == []
+
+    monkeypatch.setattr(storage, "_archive", archive)
+    assert [e["filas"] for e in expire(storage)] == [2]
+    assert storage.get_rollups("consumo", 1)[0]["cantidad_agua"]["n"] == 2
+
+
+def test_thermal_frames_are_streamed_to_the_archive(storage, monkeypatch):
+    monkeypatch.setattr(settings, "THERMAL_KEYFRAME_INTERVAL", 2)
+    lote_id = 990
+    for i in range(3):
+        mapa = {
+            "mapa_id": i,
+            "lote_id": lote_id,
+            "fecha": datetime(2020, 1, 31, 23, 58) + timedelta(minutes=i),
+            "temperaturas": [[20.0 + i, 21.0], [22.0, 23.0]],
+        }
+        thermal_store.add_frame(mapa)
+        storage.insert_mapa_termico(mapa)
+
+    results = expire(storage)
+
+    assert [(r["mes"], r["filas"]) for r in results] == [((2020, 1), 2), ((2020, 2), 1)]
+    with gzip.open(results[0]["archivo"], "rt") as f:
+        frames = [json.loads(line) for line in f]
+    assert [f["temperaturas"][0][0] for f in frames] == [20.0, 21.0]
+    assert thermal_store.get_frame(lote_id) is None
+    assert [r["temperatura_max"]["max"] for r in storage.get_rollups("mapa_termico", lote_id)] == [23.0, 23.0]
@@ -0,0 +1,149 @@
+"""
+Tests for the keyframe + delta thermal map store
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from app.core.config import settings
+from app.models.schemas import MapaTermicoCreate
+from app.services.thermal_storage import ThermalMapStore
+
+START = datetime(2024, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    monkeypatch.setattr(settings, "THERMAL_KEYFRAME_INTERVAL", 3)
+    return ThermalMapStore()
+
+
+def make_grid(i, shape=(3, 4)):
+    rng = np.random.default_rng(i)
+    return np.round(20 + rng.normal(0, 2, shape), 1).tolist()
+
+
+def add(store, i, fecha=None, grid=None, lote_id=1):
+    return store.add_frame({
+        "mapa_id": i,
+        "lote_id": lote_id,
+        "fecha": fecha or START + timedelta(minutes=i),
+        "temperaturas": grid if grid is not None else make_grid(i),
+    })
+
+
+def test_frames_round_trip_through_keyframes_and_deltas(store):
+    stats = [add(store, i) for i in range(8)]
+
+    assert [s["keyframe"] for s in stats] == [True, False, False, True, False, False, True, False]
+    for i in range(8):
+        frame = store.get_frame(1, START + timedelta(minutes=i))
+        assert frame["mapa_id"] == i
+        np.testing.assert_allclose(frame["temperaturas"], make_grid(i), atol=0.05)
+
+
+def test_shape_change_starts_a_keyframe(store):
+    add(store, 0)
+    assert add(store, 1, grid=make_grid(1, (2, 2)))["keyframe"]
+    np.testing.assert_allclose(store.get_frame(1)["temperaturas"], make_grid(1, (2, 2)), atol=0.05)
+
+
+def test_get_frame_returns_latest_at_or_before_fecha(store):
+    for i in range(4):
+        add(store, i)
+
+    assert store.get_frame(1, START + timedelta(minutes=2, seconds=30))["mapa_id"] == 2
+    assert store.get_frame(1)["mapa_id"] == 3
+    assert store.get_frame(1, START - timedelta(minutes=1)) is None
+    assert store.get_frame(2) is None
+
+
+def test_out_of_order_frames_play_back_in_time_order(store):
+    order = [0, 2, 1, 4, 3]
+    for i in order:
+        add(store, i)
+
+    frames = list(store.iter_frames(1))
+    assert [f["mapa_id"] for f in frames] == sorted(order)
+    for frame in frames:
+        np.testing.assert_allclose(frame["temperaturas"], make_grid(frame["mapa_id"]), atol=0.05)
+
+    window = store.iter_frames(1, START + timedelta(minutes=1), START + timedelta(minutes=3))
+    assert [f["mapa_id"] for f in window] == [1, 2, 3]
+
+
+def test_naive_and_aware_timestamps_mix(store):
+    add(store, 0)
+    add(store, 1, fecha=(START + timedelta(minutes=1)).replace(tzinfo=timezone.utc))
+    add(store, 2, grid=[[5.0] * 4] * 3)
+
+    assert store.get_frame(1, (START + timedelta(minutes=1)).replace(tzinfo=timezone.utc))["mapa_id"] == 1
+    assert store.get_frame(1)["temperaturas"] == [[5.0] * 4] * 3
+
+
+def test_rejected_frame_leaves_the_stream_intact(store):
+    add(store, 0)
+    with pytest.raises(ValueError):
+        add(store, 1, grid=[[1e6] * 4] * 3)
+    add(store, 2, grid=[[5.0] * 4] * 3)
+
+    assert [f["mapa_id"] for f in store.iter_frames(1)] == [0, 2]
+    assert store.get_frame(1)["temperaturas"] == [[5.0] * 4] * 3
+
+
+@pytest.mark.parametrize("grid", [[[1.0, 2.0], [3.0]], [[]]])
+def test_ragged_or_empty_grids_are_rejected(store, grid):
+    with pytest.raises(ValueError):
+        add(store, 0, grid=grid)
+    with pytest.raises(ValidationError):
+        MapaTermicoCreate(lote_id=1, fecha=START, temperaturas=grid)
+
+
+def test_drop_before_only_drops_whole_keyframe_groups(store):
+    for i in range(8):
+        add(store, i)
+
+    # Frame 3 starts the second group; frames 0-2 are older than minute 4
+    assert store.drop_before(1, START + timedelta(minutes=4)) == 3
+    frames = list(store.iter_frames(1))
+    assert [f["mapa_id"] for f in frames] == [3, 4, 5, 6, 7]
+    for frame in frames:
+        np.testing.assert_allclose(frame["temperaturas"], make_grid(frame["mapa_id"]), atol=0.05)
+
+    # The group of frames 3-5 still holds minute 5, so nothing more goes
+    assert store.drop_before(1, START + timedelta(minutes=5)) == 0
+    assert add(store, 8)["keyframe"] is False
+
+
+def test_drop_before_keeps_groups_with_newer_out_of_order_frames(store):
+    for i in [0, 1, 9, 3, 4, 5]:
+        add(store, i)
+
+    assert store.drop_before(1, START + timedelta(minutes=6)) == 0
+
+
+def test_drop_before_removes_a_fully_expired_stream(store):
+    for i in range(4):
+        add(store, i)
+
+    assert store.drop_before(1, START + timedelta(hours=1)) == 4
+    assert store.lote_ids() == []
+    assert store.get_frame(1) is None
+
+
+def test_playback_survives_a_drop_before_midway(store):
+    for i in range(8):
+        add(store, i)
+
+    playback = store.iter_frames(1)
+    first = [next(playback) for _ in range(2)]
+    store.drop_before(1, START + timedelta(minutes=7))
+    add(store, 8)
+    frames = first + list(playback)
+
+    assert [f["mapa_id"] for f in frames] == list(range(8))
+    for frame in frames:
+        np.testing.assert_allclose(frame["temperaturas"], make_grid(frame["mapa_id"]), atol=0.05)